@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+# Modules of the compute core, which must import without the UI and plotting stacks
+CORE_MODULES = ["wacc_calculator_v1", "wacc_prediction_v2"]
+HEAVY_MODULES = ["streamlit", "streamlit_folium", "xarray", "matplotlib", "seaborn", "plotly", "altair", "folium", "branca",
+                 "kaleido", "vl_convert", "openpyxl", "scipy", "numba"]
+IMPORT_BUDGET = 3.0
+
+
+def check_import_budget(modules=CORE_MODULES, heavy_modules=HEAVY_MODULES, budget=IMPORT_BUDGET):
+
+    # Import the modules in a fresh interpreter and report what was loaded
+    code = ("import sys, time\n"
+            "start = time.perf_counter()\n"
+            "import " + ", ".join(modules) + "\n"
+            "print(time.perf_counter() - start)\n"
+            "print(' '.join(sorted(set(name.split('.')[0] for name in sys.modules))))\n")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.splitlines()
+    elapsed = float(output[0])
+    loaded = set(output[1].split())
+
+    # Check against the heavy modules and the time budget
+    failures = []
+    pulled_in = sorted(loaded.intersection(heavy_modules))
+    if pulled_in:
+        failures.append("heavy modules imported: " + ", ".join(pulled_in))
+    if elapsed > budget:
+        failures.append("import took %.2fs, over the %.2fs budget" % (elapsed, budget))
+
+    return elapsed, failures
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else IMPORT_BUDGET
+    elapsed, failures = check_import_budget(budget=budget)
+    print("Imported " + ", ".join(CORE_MODULES) + " in %.2fs" % elapsed)
+    for failure in failures:
+        print("FAIL: " + failure)
+    sys.exit(1 if failures else 0)
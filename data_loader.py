@@ -0,0 +1,235 @@
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+import pandas as pd
+import numpy as np
+
+
+# Columns and series of the Ember yearly data used by the predictor
+EMBER_COLUMNS = ["Area", "Country code", "Year", "Continent", "Category", "Unit", "Variable", "Value", "YoY absolute change"]
+EMBER_SERIES = [("Capacity", "GW"), ("Electricity generation", "%"), ("Electricity generation", "TWh")]
+EMBER_CATEGORICALS = ["Area", "Country code", "Continent", "Category", "Unit", "Variable"]
+
+
+def read_ember_generation(path, chunksize=100000, series=EMBER_SERIES):
+
+    # Read the long-format file in chunks, keeping only the capacity, penetration and generation series
+    chunks = []
+    for chunk in pd.read_csv(path, usecols=EMBER_COLUMNS, chunksize=chunksize):
+        keep = False
+        for category, unit in series:
+            keep = keep | ((chunk["Category"] == category) & (chunk["Unit"] == unit))
+        chunks.append(chunk.loc[keep])
+    data = pd.concat(chunks, ignore_index=True)
+
+    # Store repeated identifiers as categoricals
+    for column in EMBER_CATEGORICALS:
+        data[column] = data[column].astype("category")
+
+    return data[EMBER_COLUMNS]
+
+
+def frame_memory(data):
+
+    # Memory used by a dataframe, including the contents of object columns
+    return int(data.memory_usage(deep=True).sum())
+
+
+def compact_frame(data, max_category_ratio=0.5):
+
+    # Store repeated string identifiers as categoricals, floats as float32 and integers in the smallest integer type
+    data = data.copy()
+    for column in data.columns:
+        values = data[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            continue
+        if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) == "string":
+            if values.nunique() <= max_category_ratio * len(values):
+                data[column] = values.astype("category")
+        elif pd.api.types.is_float_dtype(values):
+            data[column] = values.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            data[column] = pd.to_numeric(values, downcast="integer")
+
+    return data
+
+
+class SnapshotCache:
+    def __init__(self, snapshot_dir="./DATA/.snapshots"):
+        """ Initialises the SnapshotCache Class, which converts each input file into a binary columnar (Feather) snapshot
+        the first time it is parsed and reloads from that snapshot for as long as the source file is unchanged
+
+        Inputs:
+        Snapshot_dir - directory in which snapshots are stored. Set to None to disable snapshots and always parse the source
+
+        Snapshots are keyed by a SHA-256 hash of the source file path and contents together with the reader and its arguments, so
+        editing a source file (or changing how it is read) invalidates its snapshot automatically. Column labels are
+        stored as strings.
+        """
+
+        self.snapshot_dir = snapshot_dir
+
+    def read_csv(self, path, **kwargs):
+
+        return self.load(path, pd.read_csv, **kwargs)
+
+    def read_excel(self, path, sheet_name, **kwargs):
+
+        return self.load(path, pd.read_excel, sheet_name=sheet_name, **kwargs)
+
+    def load(self, path, reader, key=None, **kwargs):
+
+        # Parse directly if snapshots are disabled
+        if self.snapshot_dir is None:
+            return self.normalise(reader(path, **kwargs))
+
+        # Identify the snapshot for this version of the source file
+        snapshot_path = self.snapshot_path(path, reader, key, **kwargs)
+        if os.path.exists(snapshot_path):
+            try:
+                return pd.read_feather(snapshot_path)
+            except (ImportError, OSError, ValueError):
+                pass
+
+        # Parse the source and store the snapshot
+        data = self.normalise(reader(path, **kwargs))
+        self.write_snapshot(data, snapshot_path)
+
+        return data
+
+    def snapshot_path(self, path, reader, key=None, **kwargs):
+
+        # Hash the contents of the source file
+        file_hash = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                file_hash.update(block)
+
+        # Include the reader and its arguments in the key
+        file_hash.update(repr((getattr(reader, "__name__", str(reader)), key, sorted(kwargs.items()))).encode("utf-8"))
+        stem = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+        label = str(kwargs.get("sheet_name", key or "data")).replace(" ", "_")
+
+        # Identify the source by its absolute path, so that same-named files in different directories do not share snapshots
+        source_hash = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+
+        return os.path.join(self.snapshot_dir, stem + "." + label + "." + source_hash + "." + file_hash.hexdigest()[:20] + ".feather")
+
+    def write_snapshot(self, data, snapshot_path):
+
+        # Write to a uniquely named temporary file first, so that concurrent processes and threads never read a partial snapshot
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.snapshot_dir, prefix=os.path.basename(snapshot_path) + ".", suffix=".tmp", delete=False) as f:
+            temporary_path = f.name
+        try:
+            data.to_feather(temporary_path)
+            os.replace(temporary_path, snapshot_path)
+        except (ImportError, OSError, ValueError, TypeError, NotImplementedError):
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            return
+
+        # Remove stale snapshots of the same source file and label
+        prefix = os.path.basename(snapshot_path).rsplit(".", 2)[0] + "."
+        for name in os.listdir(self.snapshot_dir):
+            if name.startswith(prefix) and name.endswith(".feather") and name != os.path.basename(snapshot_path):
+                try:
+                    os.remove(os.path.join(self.snapshot_dir, name))
+                except OSError:
+                    pass
+
+    def normalise(self, data):
+
+        # Feather requires string column labels and a default index
+        data.columns = data.columns.astype("str")
+        data = data.reset_index(drop=True)
+
+        return data
+
+
+class DatasetRegistry:
+    def __init__(self, compact=False):
+        """ Initialises the DatasetRegistry Class, which holds named inputs that are loaded on first access and only once
+
+        Inputs:
+        Compact - store datasets in a compact form as they are loaded (categorical identifiers, float32 values and small
+        integers), recording the memory used before and after
+
+        Loaders are registered by name and called the first time the dataset is requested. The names requested inside a
+        track() block are recorded, so that the datasets used by a given call path can be reported.
+        """
+
+        self.loaders = {}
+        self.datasets = {}
+        self.trackers = []
+        self.lock = threading.RLock()
+        self.compact = compact
+        self.memory = {}
+
+    def register(self, name, loader):
+
+        # Store the loader and discard any previously loaded data
+        with self.lock:
+            self.loaders[name] = loader
+            self.datasets.pop(name, None)
+
+    def get(self, name):
+
+        # Record the access for any active trackers
+        for touched in self.trackers:
+            touched.add(name)
+
+        # Load the dataset on first access
+        if name not in self.datasets:
+            with self.lock:
+                if name not in self.datasets:
+                    data = self.loaders[name]()
+                    if self.compact:
+                        data = self.compact_dataset(name, data)
+                    self.datasets[name] = data
+
+        return self.datasets[name]
+
+    def set(self, name, data):
+
+        self.datasets[name] = data
+
+    def compact_dataset(self, name, data):
+
+        # Compact dataframes, and any other dataset that provides its own compact form
+        if isinstance(data, pd.DataFrame):
+            original = frame_memory(data)
+            data = compact_frame(data)
+            self.memory[name] = (original, frame_memory(data))
+        elif hasattr(data, "compact"):
+            original = data.memory_usage()
+            data = data.compact()
+            self.memory[name] = (original, data.memory_usage())
+
+        return data
+
+    def memory_report(self):
+
+        # Memory used by each compacted dataset, in MB
+        report = pd.DataFrame([(name, original / 1e6, compact / 1e6) for name, (original, compact) in self.memory.items()],
+                              columns=["Dataset", "Original (MB)", "Compact (MB)"]).set_index("Dataset")
+        report["Saved (MB)"] = report["Original (MB)"] - report["Compact (MB)"]
+
+        return report
+
+    def loaded(self):
+
+        return [name for name in self.loaders if name in self.datasets]
+
+    @contextmanager
+    def track(self):
+
+        # Collect the names of all datasets requested within the block
+        touched = set()
+        self.trackers.append(touched)
+        try:
+            yield touched
+        finally:
+            self.trackers.remove(touched)
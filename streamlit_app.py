@@ -19,7 +19,19 @@ from matplotlib.legend_handler import HandlerTuple
 def convert_for_download(df):
     return df.to_csv().encode("utf-8")
 
-def display_map(df, technology):
+@st.cache_resource
+def load_predictor(recent_year, compact=False):
+    return WaccPredictor(crp_data = "./DATA/CRPs.csv", 
+    generation_data="./DATA/Ember Yearly Data 2023.csv", GDP="./DATA/GDPPerCapita.csv",
+    tax_data="./DATA/CORPORATE_TAX_DATA.csv", ember_targets="./DATA/Ember_2030_Targets.csv", 
+    us_ir="./DATA/US_IR.csv", imf_data="./DATA/IMF_Projections.csv", collated_crp_cds="./DATA/Collated_CRP_CDS.xlsx", projection_year=recent_year, compact=compact)
+
+@st.cache_resource
+def load_visualiser(recent_year):
+    wacc_predictor = load_predictor(recent_year)
+    return VisualiserClass(wacc_predictor.crp_data, wacc_predictor.calculator.tech_premiums)
+
+def display_map(df, technology, visualiser):
     technology_name = visualiser.tech_dict_reverse.get(technology)
     map = folium.Map(location=[10, 0], zoom_start=1, control_scale=True, scrollWheelZoom=True, tiles='CartoDB positron')
     df = df.rename(columns={"Country code":"iso3_code"})
@@ -165,7 +177,7 @@ def plot_ranking_table(raw_df, country_codes, technology, year):
     #chart_with_double_x_axis.save("./PLOTS/Chart_Countries.png", ppi=1000)
     st.write(chart_with_double_x_axis)
 
-def plot_ranking_table_tech(raw_df, tech_codes, technology, year):
+def plot_ranking_table_tech(raw_df, tech_codes, technology, year, visualiser):
 
     # Select techs
     df = raw_df[raw_df["Technology"].isin(tech_codes)]
@@ -224,57 +236,36 @@ def plot_comparison_chart(df, technology, year, print=None):
         #chart.save("./PLOTS/Chart_Temporal.png", ppi=1000)
     st.write(chart)
 
-def produce_aggregated_historical_data(wacc_predictor, tech_names):
-    counter = 0   
-    counter_year = 0 
-    for year in np.arange(2015, 2026):
-        for technology in tech_names:
-            technology = visualiser.tech_dictionary.get(technology)
-            yearly_waccs = wacc_predictor.calculate_historical_waccs(year, technology)
-            wacc_data = yearly_waccs
-            wacc_data["Technology"] = visualiser.tech_dict_reverse.get(technology)
-            print(wacc_data)
-            if counter == 0:
-                merged_df = wacc_data[["Country code", "WACC", "Year", "Technology"]]
-            else:
-                merged_df = pd.concat([merged_df, wacc_data[["Country code", "WACC", "Year", "Technology"]]])
-            counter = counter + 1
-        if counter_year == 0:
-            results_df = merged_df
-        else:
-            results_df = pd.concat([results_df, merged_df])
-        counter_year = counter_year + 1
-    #print(np.unique(results_df["Year"]))
+def produce_aggregated_waccs(wacc_predictor, tech_names, visualiser, years):
+    technologies = [visualiser.tech_dictionary.get(technology) for technology in tech_names]
+    results_df = wacc_predictor.calculate_wacc_grid(years, technologies)
+    results_df["Technology"] = results_df["Technology"].map(visualiser.tech_dict_reverse)
+    results_df = results_df[["Country code", "WACC", "Year", "Technology"]]
     results_df["WACC"] = results_df["WACC"].round(2)
+    return results_df
+
+def produce_aggregated_historical_data(wacc_predictor, tech_names, visualiser):
+    results_df = produce_aggregated_waccs(wacc_predictor, tech_names, visualiser, np.arange(2015, 2026))
     results_df.to_csv("./DATA/HISTORICAL_WACCS.csv")
 
-def produce_aggregated_future_data(wacc_predictor, tech_names):
-    counter = 0   
-    counter_year = 0 
-    for year in np.arange(2026, 2037):
-        for technology in tech_names:
-            technology = visualiser.tech_dictionary.get(technology)
-            yearly_waccs = wacc_predictor.calculate_all_future_waccs(year, technology)
-            wacc_data = yearly_waccs
-            wacc_data["Technology"] = visualiser.tech_dict_reverse.get(technology)
-            print(wacc_data)
-            if counter == 0:
-                merged_df = wacc_data[["Country code", "WACC", "Year", "Technology"]]
-            else:
-                merged_df = pd.concat([merged_df, wacc_data[["Country code", "WACC", "Year", "Technology"]]])
-            counter = counter + 1
-        if counter_year == 0:
-            results_df = merged_df
-        else:
-            results_df = pd.concat([results_df, merged_df])
-        counter_year = counter_year + 1
-    #print(np.unique(results_df["Year"]))
-    results_df["WACC"] = results_df["WACC"].round(2)
+def produce_aggregated_future_data(wacc_predictor, tech_names, visualiser):
+    results_df = produce_aggregated_waccs(wacc_predictor, tech_names, visualiser, np.arange(2026, 2037))
     results_df.to_csv("./DATA/FUTURE_WACCS.csv")
 
+# Produce output data in long and wide formats
+def produce_wacc_estimates(wacc_predictor, tech_names, visualiser):
+    concat_data = produce_aggregated_waccs(wacc_predictor, tech_names, visualiser, np.arange(2015, 2037))
+    concat_data = concat_data.merge(visualiser.crp_country, how="left", on="Country code")
+    concat_data = concat_data[["Country", "Country code", "Year", "Technology", "WACC"]]
+    concat_data = concat_data.loc[concat_data["Country code"] != "ABD"]
+    concat_data.to_csv("./DATA/WACC_ESTIMATES_LONG.csv")
+    concat_wide = pd.pivot_table(concat_data, index=["Country", "Country code", "Technology"], values="WACC", columns=["Year"])
+    concat_wide.to_csv("./DATA/WACC_ESTIMATES_WIDE.csv")
+    return concat_data, concat_wide
+
 
 # Produce data for output
-def produce_data_for_output():
+def produce_data_for_output(visualiser):
     irena = pd.read_csv("./DATA/IRENA_DATA.csv", encoding='latin1')
     iea = pd.read_csv("./DATA/IEA_CoC.csv")
     fincore = pd.read_csv("./DATA/HISTORICAL_WACCS.csv")
@@ -285,207 +276,178 @@ def produce_data_for_output():
     wacc_coverage = fincore[["Country code", "FINCORE"]].merge(irena[["Country code", "IRENA"]], how="left").merge(iea[["Country code", "IEA"]], how="left", on="Country code").merge(steffen[["Country code", "STEFFEN"]], how="left", on="Country code")
     visualiser.create_chloropleth_map(wacc_coverage)
     
-# Call WaccPredictor Object
-recent_year = 2025
-wacc_predictor = WaccPredictor(crp_data = "./DATA/CRPs.csv", 
-generation_data="./DATA/Ember Yearly Data 2023.csv", GDP="./DATA/GDPPerCapita.csv",
-tax_data="./DATA/CORPORATE_TAX_DATA.csv", ember_targets="./DATA/Ember_2030_Targets.csv", 
-us_ir="./DATA/US_IR.csv", imf_data="./DATA/IMF_Projections.csv", collated_crp_cds="./DATA/Collated_CRP_CDS.xlsx", projection_year=recent_year)
-
-# Call visualiser
-visualiser = VisualiserClass(wacc_predictor.crp_data, wacc_predictor.calculator.tech_premiums)
-country_names = sorted(visualiser.crp_dictionary.keys())
-tech_names = sorted(visualiser.tech_dictionary.keys())
-tech_names = [x for x in tech_names if x !="Other"]
-
-
-
-st.title("Financing Costs and Risks in Energy infrastructure (FinCoRE) - An Estimation Tool")
-year = st.selectbox(
-        "Year", ("2015", "2016", "2017", "2018", "2019", "2020", "2021", "2022", "2023", "2024", "2025", "2026", "2027", "2028", "2029", "2030", "2031", "2032", "2033", "2034"), 
-         index=9, key="Year", placeholder="Select Year...")
-technology_name = st.selectbox(
-        "Displayed Technology", tech_names, 
-         index=19, placeholder="Select Technology...", key="Technology")
-technology = visualiser.tech_dictionary.get(technology_name)
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["🌐 Map", "🥇 Global Comparison", "🔭 Country Projections", "🛠️ Technologies", "📈 Calculator", "ℹ️ Methods", "📝 About"])
-
-if int(year) > recent_year:
-    yearly_waccs = wacc_predictor.calculate_all_future_waccs(year, technology)
-else:
-    yearly_waccs = wacc_predictor.calculate_historical_waccs(year, technology)
-
-
-with tab1:
-    st.header("Map")
-    display_map(yearly_waccs, technology_name)
-    st.download_button(
-    label="Download all national estimates",
-    data=convert_for_download(yearly_waccs),
-    file_name="yearly-costsofcapital-global-"+ technology + ".csv",
-    mime="text/csv",
-    icon=":material/download:",
-    key="all-national-WACC-single-year",
-)
-with tab2:
-    st.header("Global Comparison and Breakdown")
-    defaults = ["USA", "IND", "GBR", "JPN", "CHN", "BRA"]
-    defaults_country_names = [visualiser.crp_dict_reverse[x] for x in defaults]
-    selected_countries = st.multiselect("Countries to compare", options=visualiser.crp_dict_reverse.values(), default=defaults_country_names)
-    selected_countries_iso = [visualiser.crp_dictionary[x] for x in selected_countries]
-    sorted_waccs = sort_waccs(yearly_waccs)
-    plot_ranking_table(sorted_waccs, selected_countries_iso, technology_name, year)
-with tab3:
-    st.header("Historical and Projected Estimates")
-    country_selection = st.selectbox(
-        "Country", options=country_names, 
-         index=None, placeholder="Select Country of Interest...", key="CountryProjections")
-    country_selection = visualiser.crp_dictionary.get(country_selection)
-    options = ["Interest Rate Change", "Renewable Growth", "GDP Change"]
-    options_mapping = {"Interest Rate Change": "interest_rate", "Renewable Growth": "renewable_targets", "GDP Change": "gdp_change"}
-    if country_selection is not None:
-        projection_assumptions = st.pills("Projection Assumptions", options, selection_mode="multi")
-        for i in projection_assumptions:
-            name = options_mapping.get(i)
-            globals()[f"{name}"] = f"{name}"
-        if "Interest Rate Change" not in projection_assumptions:
-            interest_rate = None
-        if "Renewable Growth" not in projection_assumptions:
-            renewable_targets = None
-        if "GDP Change" not in projection_assumptions:
-            gdp_change = None
-        historical_country_data = wacc_predictor.year_range_wacc(start_year=2015, end_year=recent_year, 
-                                                             technology=technology, country=country_selection)
-        if len(projection_assumptions) > 0:
-            future_waccs = wacc_predictor.projections_wacc(end_year=2034, technology=technology, country=country_selection, 
-                                                    interest_rates=interest_rate, GDP_change=gdp_change, renewable_targets=renewable_targets)
-            historical_country_data = pd.concat([historical_country_data, future_waccs])
-        historical_country_data = historical_country_data.drop(columns = ["Debt Share", "Equity Cost", "Debt Cost", "Tax Rate", "Country code", "WACC"])
-        plot_comparison_chart(historical_country_data, technology_name, year)
-        st.download_button(
-    label="Download national timeseries for selected technology",
-    data=convert_for_download(historical_country_data),
-    file_name="yearly-costsofcapital-national-"+ technology + "-" + country_selection +".csv",
-    mime="text/csv",
-    icon=":material/download:",
-    key="national-WACC-single-tech"
-)
 
-with tab4:
-    st.header("Technology Comparison")
-    country_tech_selection = st.selectbox(
-        "Country", options=country_names, 
-         index=None, placeholder="Select Country of Interest...", key="CountryTechs")
-    selected_techs = st.multiselect("Technologies to compare", options=tech_names, default=["Solar PV", "Hydroelectric", "Gas (unabated)"])
-    selected_techs = [visualiser.tech_dictionary.get(x) for x in selected_techs]
-    country_tech_selection = visualiser.crp_dictionary.get(country_tech_selection)
-    
-    if country_tech_selection is not None:
-        country_technology_comparison = wacc_predictor.calculate_technology_wacc(year=year, country=country_tech_selection, technologies=selected_techs)
-        sorted_tech_comparison = sort_waccs(country_technology_comparison)
-        plot_ranking_table_tech(sorted_tech_comparison, selected_techs, technology_name, year)
-        st.download_button(
-        label="Download selected technology estimates",
-        data=convert_for_download(sorted_tech_comparison),
-        file_name="selected-technology-costsofcapital-"+ country_tech_selection + ".csv",
-        mime="text/csv",
-        icon=":material/download:",
-        key="all-technology-WACC-single-country",
-    )
+def main():
+    # Call WaccPredictor Object
+    recent_year = 2025
+    wacc_predictor = load_predictor(recent_year)
 
-with tab5:
-    st.header("Country Calculator")
-    country_code_name = st.selectbox(
-        "Country", country_names, 
-         index=167, placeholder="Select Country...", key="Country")
-    country_code = visualiser.crp_dictionary.get(country_code_name)
-    col1, col2, col3, col4 = st.columns(4)
-    if int(year) > recent_year:
-        yearly_data = wacc_predictor.calculate_future_wacc(year, technology, country_code,  interest_rates="Yes", GDP_change="Yes", renewable_targets="Yes")
-    else:
-        yearly_data = wacc_predictor.calculate_yearly_wacc(year, technology, country_code)
-    with col1:
-        st.subheader("Macro Environment")
-        rf_rate = st.number_input("Risk-free Rate (%)", value=2.5, min_value=1.0, max_value=10.0, step=0.1)
-        crp = st.number_input("Country Risk Premium (%)", value=5.0, min_value=0.0, max_value=20.0, step=0.1)
-    with col2:
-        st.subheader("Renewable Development")
-        market_maturity = st.selectbox(
-        "Market Maturity",["Mature", "Intermediate", "Immature"], 
-         index=2, placeholder="Select Maturity...", key="Maturity")
-        tech_penetration = st.number_input("Renewable Penetration (%)", value=0.0, min_value=0.0, max_value=30.0, step=1.0)
-    with col3:
-        st.subheader("Debt-Equity Premiums")
-        st.write("")
-        st.write("")
-        erp = st.number_input("Equity Risk Premium (%)", value=5.0, min_value=0.0, max_value=10.0, step=0.1)
-        lm = st.number_input("Lenders Margin (%)", value=2.0, min_value=0.0, max_value=5.0, step=0.1)
-    with col4:
-        st.subheader("Financing Structure")
-        st.write("")
-        st.write("")
-        debt_share = st.number_input("Debt Share (%)", value=60, min_value=0, max_value=100, step=10)
-        tax_rate = st.number_input("Tax Rate (%)", value=25, min_value=0, max_value=50, step=1)
-    st.subheader("Comparison of Calculated WACC with Historical Estimates")
-
-    # Evaluate projected data
-    projection_year = recent_year
-    projected_data = wacc_predictor.calculator.calculate_wacc_individual(rf_rate=rf_rate, crp=crp, cds=crp, tax_rate=tax_rate, technology=technology, country_code=country_code, 
-                                                                         year=projection_year,erp=erp,tech_penetration=tech_penetration, market_maturity=market_maturity, penetration_value=tech_penetration)
-    projected_data["Year"] = projection_year
-
-    # Extract historical data for the given country
-    yearly_waccs = wacc_predictor.calculate_historical_waccs(str(recent_year), technology)
-    selected_wacc = get_selected_country(yearly_waccs, country_code)
-    selected_wacc["Year"] = year
-
-    # Create a bar chart with historical, cost of equity, cost of debt, and overall wacc
-    evaluated_wacc_data = pd.concat([selected_wacc, projected_data])
-    evaluated_wacc_data = evaluated_wacc_data.drop(columns = ["Debt Share", "Equity Cost", "Debt Cost", "Tax Rate", "Country code", "WACC"])
-    plot_comparison_chart(evaluated_wacc_data, technology_name, year, print="None")
-
-
-with tab6:
-    text = open('about.md').read()
-    st.write(text)
-
-with tab7:
-    st.subheader("About")
-    with open("about.md", "r", encoding="utf-8") as f:
-        about_text = f.read()
-    with open("data.md", "r", encoding="utf-8") as f:
-        data_text = f.read()
-    st.write(about_text)
-    st.subheader("Data and Publication")
-    st.write(data_text)
-    st.subheader("Contact")
-    
-    st.write("The FinCoRE tool is  a part of Climate Compatible Growth's suite of open-source Energy Modelling Tools, with its development led by Luke Hatton at Imperial College London. He can be contacted atl.hatton23@imperial.ac.uk")
-    st.subheader("License and Data Use Permissions")
-    st.write("The data available from this tool is licensed as Creative Commons Attribution-NonCommercial International (CC BY-NC 4.0), which means you are free to copy, redistribute"
-            + " and adapt it for non-commercial purposes, provided you give appropriate credit. If you wish to use the data for commercial purposes, please get in touch.")
+    # Call visualiser
+    visualiser = load_visualiser(recent_year)
+    country_names = sorted(visualiser.crp_dictionary.keys())
+    tech_names = sorted(visualiser.tech_dictionary.keys())
+    tech_names = [x for x in tech_names if x !="Other"]
 
 
 
+    st.title("Financing Costs and Risks in Energy infrastructure (FinCoRE) - An Estimation Tool")
+    year = st.selectbox(
+            "Year", ("2015", "2016", "2017", "2018", "2019", "2020", "2021", "2022", "2023", "2024", "2025", "2026", "2027", "2028", "2029", "2030", "2031", "2032", "2033", "2034"), 
+             index=9, key="Year", placeholder="Select Year...")
+    technology_name = st.selectbox(
+            "Displayed Technology", tech_names, 
+             index=19, placeholder="Select Technology...", key="Technology")
+    technology = visualiser.tech_dictionary.get(technology_name)
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["🌐 Map", "🥇 Global Comparison", "🔭 Country Projections", "🛠️ Technologies", "📈 Calculator", "ℹ️ Methods", "📝 About"])
 
+    if int(year) > recent_year:
+        yearly_waccs = wacc_predictor.calculate_all_future_waccs(year, technology)
+    else:
+        yearly_waccs = wacc_predictor.calculate_historical_waccs(year, technology)
 
-# Produce output data in long and wide formats
-#produce_aggregated_historical_data(wacc_predictor, tech_names)
-#produce_aggregated_future_data(wacc_predictor, tech_names)
-#data = pd.read_csv("./DATA/HISTORICAL_WACCS.csv")
-#future_data = pd.read_csv("./DATA/FUTURE_WACCS.csv")
-#concat_data = pd.concat([data, future_data], ignore_index=True)
-#concat_data = concat_data.round(decimals=2)
-#concat_data = concat_data.merge(visualiser.crp_country, how="left", on="Country code")
-#concat_data = concat_data[["Country", "Country code", "Year", "Technology", "WACC"]]
-#concat_data = concat_data.loc[concat_data["Country code"] != "ABD"]
-#concat_data.sort_values("Country")
-#concat_data.to_csv("./DATA/WACC_ESTIMATES_LONG.csv")
-#concat_wide = pd.pivot_table(concat_data, index=["Country", "Country code", "Technology"], values="WACC", columns=["Year"])
-#concat_wide = concat_wide.rename(columns={"Year":"index"})
-#concat_wide.to_csv("./DATA/WACC_ESTIMATES_WIDE.csv")
 
+    with tab1:
+        st.header("Map")
+        display_map(yearly_waccs, technology_name, visualiser)
+        st.download_button(
+        label="Download all national estimates",
+        data=convert_for_download(yearly_waccs),
+        file_name="yearly-costsofcapital-global-"+ technology + ".csv",
+        mime="text/csv",
+        icon=":material/download:",
+        key="all-national-WACC-single-year",
+    )
+    with tab2:
+        st.header("Global Comparison and Breakdown")
+        defaults = ["USA", "IND", "GBR", "JPN", "CHN", "BRA"]
+        defaults_country_names = [visualiser.crp_dict_reverse[x] for x in defaults]
+        selected_countries = st.multiselect("Countries to compare", options=visualiser.crp_dict_reverse.values(), default=defaults_country_names)
+        selected_countries_iso = [visualiser.crp_dictionary[x] for x in selected_countries]
+        sorted_waccs = sort_waccs(yearly_waccs)
+        plot_ranking_table(sorted_waccs, selected_countries_iso, technology_name, year)
+    with tab3:
+        st.header("Historical and Projected Estimates")
+        country_selection = st.selectbox(
+            "Country", options=country_names, 
+             index=None, placeholder="Select Country of Interest...", key="CountryProjections")
+        country_selection = visualiser.crp_dictionary.get(country_selection)
+        options = ["Interest Rate Change", "Renewable Growth", "GDP Change"]
+        options_mapping = {"Interest Rate Change": "interest_rate", "Renewable Growth": "renewable_targets", "GDP Change": "gdp_change"}
+        if country_selection is not None:
+            projection_assumptions = st.pills("Projection Assumptions", options, selection_mode="multi")
+            selected_assumptions = [options_mapping.get(i) for i in projection_assumptions]
+            interest_rate = "interest_rate" if "interest_rate" in selected_assumptions else None
+            renewable_targets = "renewable_targets" if "renewable_targets" in selected_assumptions else None
+            gdp_change = "gdp_change" if "gdp_change" in selected_assumptions else None
+            historical_country_data = wacc_predictor.calculate_country_waccs(country_selection, technology, start_year=2015, end_year=recent_year)
+            if len(projection_assumptions) > 0:
+                future_waccs = wacc_predictor.calculate_country_projections(country_selection, technology, end_year=2034, 
+                                                        interest_rates=interest_rate, GDP_change=gdp_change, renewable_targets=renewable_targets)
+                historical_country_data = pd.concat([historical_country_data, future_waccs])
+            historical_country_data = historical_country_data.drop(columns = ["Debt Share", "Equity Cost", "Debt Cost", "Tax Rate", "Country code", "WACC"])
+            plot_comparison_chart(historical_country_data, technology_name, year)
+            st.download_button(
+        label="Download national timeseries for selected technology",
+        data=convert_for_download(historical_country_data),
+        file_name="yearly-costsofcapital-national-"+ technology + "-" + country_selection +".csv",
+        mime="text/csv",
+        icon=":material/download:",
+        key="national-WACC-single-tech"
+    )
+
+    with tab4:
+        st.header("Technology Comparison")
+        country_tech_selection = st.selectbox(
+            "Country", options=country_names, 
+             index=None, placeholder="Select Country of Interest...", key="CountryTechs")
+        selected_techs = st.multiselect("Technologies to compare", options=tech_names, default=["Solar PV", "Hydroelectric", "Gas (unabated)"])
+        selected_techs = [visualiser.tech_dictionary.get(x) for x in selected_techs]
+        country_tech_selection = visualiser.crp_dictionary.get(country_tech_selection)
+
+        if country_tech_selection is not None:
+            country_technology_comparison = wacc_predictor.calculate_technology_wacc(year=year, country=country_tech_selection, technologies=selected_techs)
+            sorted_tech_comparison = sort_waccs(country_technology_comparison)
+            plot_ranking_table_tech(sorted_tech_comparison, selected_techs, technology_name, year, visualiser)
+            st.download_button(
+            label="Download selected technology estimates",
+            data=convert_for_download(sorted_tech_comparison),
+            file_name="selected-technology-costsofcapital-"+ country_tech_selection + ".csv",
+            mime="text/csv",
+            icon=":material/download:",
+            key="all-technology-WACC-single-country",
+        )
+
+    with tab5:
+        st.header("Country Calculator")
+        country_code_name = st.selectbox(
+            "Country", country_names, 
+             index=167, placeholder="Select Country...", key="Country")
+        country_code = visualiser.crp_dictionary.get(country_code_name)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.subheader("Macro Environment")
+            rf_rate = st.number_input("Risk-free Rate (%)", value=2.5, min_value=1.0, max_value=10.0, step=0.1)
+            crp = st.number_input("Country Risk Premium (%)", value=5.0, min_value=0.0, max_value=20.0, step=0.1)
+        with col2:
+            st.subheader("Renewable Development")
+            market_maturity = st.selectbox(
+            "Market Maturity",["Mature", "Intermediate", "Immature"], 
+             index=2, placeholder="Select Maturity...", key="Maturity")
+            tech_penetration = st.number_input("Renewable Penetration (%)", value=0.0, min_value=0.0, max_value=30.0, step=1.0)
+        with col3:
+            st.subheader("Debt-Equity Premiums")
+            st.write("")
+            st.write("")
+            erp = st.number_input("Equity Risk Premium (%)", value=5.0, min_value=0.0, max_value=10.0, step=0.1)
+            lm = st.number_input("Lenders Margin (%)", value=2.0, min_value=0.0, max_value=5.0, step=0.1)
+        with col4:
+            st.subheader("Financing Structure")
+            st.write("")
+            st.write("")
+            debt_share = st.number_input("Debt Share (%)", value=60, min_value=0, max_value=100, step=10)
+            tax_rate = st.number_input("Tax Rate (%)", value=25, min_value=0, max_value=50, step=1)
+        st.subheader("Comparison of Calculated WACC with Historical Estimates")
+
+        # Evaluate projected data
+        projection_year = recent_year
+        projected_data = wacc_predictor.calculator.calculate_wacc_individual(rf_rate=rf_rate, crp=crp, cds=crp, tax_rate=tax_rate, technology=technology, country_code=country_code, 
+                                                                             year=projection_year,erp=erp,tech_penetration=tech_penetration, market_maturity=market_maturity, penetration_value=tech_penetration)
+        projected_data["Year"] = projection_year
+
+        # Extract historical data for the given country
+        selected_wacc = wacc_predictor.calculate_point_wacc(country_code, str(recent_year), technology)
+        selected_wacc["Year"] = year
+
+        # Create a bar chart with historical, cost of equity, cost of debt, and overall wacc
+        evaluated_wacc_data = pd.concat([selected_wacc, projected_data])
+        evaluated_wacc_data = evaluated_wacc_data.drop(columns = ["Debt Share", "Equity Cost", "Debt Cost", "Tax Rate", "Country code", "WACC"])
+        plot_comparison_chart(evaluated_wacc_data, technology_name, year, print="None")
+
+
+    with tab6:
+        text = open('about.md').read()
+        st.write(text)
+
+    with tab7:
+        st.subheader("About")
+        with open("about.md", "r", encoding="utf-8") as f:
+            about_text = f.read()
+        with open("data.md", "r", encoding="utf-8") as f:
+            data_text = f.read()
+        st.write(about_text)
+        st.subheader("Data and Publication")
+        st.write(data_text)
+        st.subheader("Contact")
+
+        st.write("The FinCoRE tool is  a part of Climate Compatible Growth's suite of open-source Energy Modelling Tools, with its development led by Luke Hatton at Imperial College London. He can be contacted atl.hatton23@imperial.ac.uk")
+        st.subheader("License and Data Use Permissions")
+        st.write("The data available from this tool is licensed as Creative Commons Attribution-NonCommercial International (CC BY-NC 4.0), which means you are free to copy, redistribute"
+                + " and adapt it for non-commercial purposes, provided you give appropriate credit. If you wish to use the data for commercial purposes, please get in touch.")
 
 
+# Produce output data in long and wide formats
+#produce_wacc_estimates(wacc_predictor, tech_names, visualiser)
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# Ember variables and series written to the synthetic generation file
+EMBER_VARIABLES = ["Solar", "Wind", "Hydro", "Gas", "Coal", "Nuclear", "Bioenergy", "Other Renewables"]
+EMBER_SERIES = [("Capacity", "GW"), ("Electricity generation", "%"), ("Electricity generation", "TWh")]
+
+
+def write_ember_file(path, countries, years=range(2015, 2025), seed=0):
+
+    # Write a small Ember yearly file in the long format, with penetration well below the targets
+    rng = np.random.default_rng(seed)
+    continents = ["Africa", "Asia", "Europe", "Oceania"]
+    rows = []
+    for i, country in enumerate(countries):
+        for year in years:
+            for category, unit in EMBER_SERIES:
+                for variable in EMBER_VARIABLES:
+                    rows.append(("Area " + country, country, year, continents[i % len(continents)], category, unit, variable, rng.uniform(0.5, 8), rng.normal()))
+    data = pd.DataFrame(rows, columns=["Area", "Country code", "Year", "Continent", "Category", "Unit", "Variable", "Value", "YoY absolute change"])
+    data.to_csv(path, index=False)
+
+
+@pytest.fixture(scope="session")
+def predictor(tmp_path_factory):
+
+    # Build a predictor on the repository data, with a synthetic Ember file covering the countries of the input cube
+    os.chdir(REPO_DIR)
+    import wacc_prediction_v2
+    countries = pd.read_excel("./DATA/Collated_CRP_CDS.xlsx", sheet_name="CRP")["Country code"].dropna().astype(str)
+    ember_path = str(tmp_path_factory.mktemp("ember") / "ember.csv")
+    write_ember_file(ember_path, [country for country in countries if country != "ERP"])
+
+    return wacc_prediction_v2.WaccPredictor(crp_data="./DATA/CRPs.csv", generation_data=ember_path, GDP="./DATA/GDPPerCapita.csv",
+                                            tax_data="./DATA/CORPORATE_TAX_DATA.csv", ember_targets="./DATA/Ember_2030_Targets.csv",
+                                            us_ir="./DATA/US_IR.csv", imf_data="./DATA/IMF_Projections.csv",
+                                            collated_crp_cds="./DATA/Collated_CRP_CDS.xlsx", projection_year=2025, snapshot_dir=None)
@@ -0,0 +1,36 @@
+import warnings
+import pytest
+from wacc_calibration import Calibrator
+
+
+def test_apply_requires_calibration(predictor):
+
+    # Applying before fitting raises a clear error and leaves the calculator unchanged
+    lenders_margin = predictor.calculator.lenders_margin
+    with pytest.raises(RuntimeError, match="calibrate"):
+        Calibrator(predictor).apply()
+    assert predictor.calculator.lenders_margin == lenders_margin
+
+
+def test_apply_writes_fitted_values_without_warnings(predictor):
+
+    # Fitted boundaries and premiums are written into float columns, without pandas dtype warnings
+    calculator = predictor.calculator
+    tables = (calculator.lenders_margin, calculator.maturity_premiums, calculator.penetration_boundaries, calculator.tech_premiums)
+    try:
+        calibrator = Calibrator(predictor)
+        row = calibrator.row_names[0]
+        technology = [technology for technology in calibrator.technologies if technology != "solar"][0]
+        calibrator = Calibrator(predictor, parameters=["lenders_margin", "intermediate_boundary[" + row + "]", "mature_boundary[" + row + "]", "relative_premium[" + technology + "]"])
+        calibrator.calibrate(max_evaluations=200, restarts=0)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            calibrator.apply()
+        fitted = dict(zip(calibrator.parameters, calibrator.fitted))
+        boundaries = calculator.penetration_boundaries.set_index("TECH")
+        assert boundaries.loc[row, "INTERMEDIATE"] == fitted["intermediate_boundary[" + row + "]"]
+        assert boundaries.loc[row, "MATURE"] == fitted["mature_boundary[" + row + "]"]
+        assert calculator.tech_premiums.set_index("TECH").loc[technology, "PREMIUM"] == fitted["relative_premium[" + technology + "]"]
+    finally:
+        calculator.lenders_margin, calculator.maturity_premiums, calculator.penetration_boundaries, calculator.tech_premiums = tables
+        calculator.parameter_cache.clear()
@@ -0,0 +1,24 @@
+def test_unknown_country_returns_no_technology_waccs(predictor):
+
+    # An unknown country gives an empty frame for historical and projected years alike
+    for year in [2020, predictor.recent_year + 3]:
+        results = predictor.calculate_technology_wacc(year, "XXX", ["solar", "gas"])
+        assert results.empty
+        assert list(results.columns) == ["Country code"] + predictor.calculator.RESULT_COLUMNS + ["Year", "Technology"]
+
+
+def test_unknown_country_returns_no_projections(predictor):
+
+    # An unknown country gives an empty frame of projections
+    results = predictor.calculate_country_projections("XXX", "solar", 2030)
+    assert results.empty
+    assert list(results.columns) == ["Country code"] + predictor.calculator.RESULT_COLUMNS + ["Year"]
+
+
+def test_unknown_country_returns_no_future_wacc(predictor):
+
+    # Codes outside the input cube, including the ERP row of the CRP data, give an empty frame
+    for country in ["XXX", "ERP"]:
+        results = predictor.calculate_future_wacc(predictor.recent_year + 3, "solar", country, interest_rates=True, GDP_change=True, renewable_targets=True)
+        assert results.empty
+        assert list(results.columns) == ["Country code"] + predictor.calculator.RESULT_COLUMNS + ["Year"]
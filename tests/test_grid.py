@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from wacc_inputs import GenerationIndex
+
+
+TECHNOLOGIES = ["solar", "onshore-wind", "offshore-Wind", "gas", "hydro", "wave", "coal-power", "nuclear", "bioenergy", "geothermal"]
+
+
+def assert_matches_grid(predictor, grid, year, technology, reference):
+
+    # The grid rows for a year and technology match the per-year calculation country by country
+    rows = grid.loc[(grid["Year"] == year) & (grid["Technology"] == technology)].reset_index(drop=True)
+    reference = reference.reset_index(drop=True)
+    columns = predictor.calculator.RESULT_COLUMNS
+    assert list(rows["Country code"]) == list(reference["Country code"])
+    np.testing.assert_allclose(rows[columns].values.astype(float), reference[columns].values.astype(float), rtol=1e-12, atol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("renewable_targets", [None, True])
+def test_grid_matches_yearly_calculations(predictor, renewable_targets):
+
+    # The grid reproduces calculate_historical_waccs up to the projection year and calculate_all_future_waccs after it
+    years = np.arange(2015, predictor.recent_year + 6)
+    grid = predictor.calculate_wacc_grid(years, TECHNOLOGIES, renewable_targets=renewable_targets)
+    for year in years:
+        for technology in TECHNOLOGIES:
+            if year <= predictor.recent_year:
+                if renewable_targets:
+                    continue
+                reference = predictor.calculate_historical_waccs(int(year), technology)
+            else:
+                reference = predictor.calculate_all_future_waccs(int(year), technology, renewable_targets=renewable_targets)
+            assert_matches_grid(predictor, grid, year, technology, reference)
+
+
+@pytest.mark.parametrize("technology", TECHNOLOGIES)
+def test_grid_matches_string_year_calculations(predictor, technology):
+
+    # The app passes years as strings, which substitutes the 2024 generation and tax data in the projection year
+    years = np.arange(2020, predictor.recent_year + 1)
+    grid = predictor.calculate_wacc_grid(years, [technology])
+    for year in years:
+        assert_matches_grid(predictor, grid, year, technology, predictor.calculate_historical_waccs(str(year), technology))
+
+
+@pytest.mark.parametrize("renewable_targets", [None, True])
+def test_grid_matches_single_country_projections(predictor, renewable_targets):
+
+    # Single-country projections read the same Ember penetration as the grid, for countries with and without targets, with
+    # penetration carried into the projections. The costs of equity and debt are compared, as the single-country debt share
+    # scales CRP by a fixed maximum
+    generation = predictor.generation
+    predictor.datasets.set("generation", GenerationIndex(predictor.generation_data, predictor.inputs.countries, max_lookback=5))
+    try:
+        years = np.arange(predictor.recent_year + 1, predictor.recent_year + 4)
+        technologies = ["solar", "onshore-wind", "hydro", "gas"]
+        grid = predictor.calculate_wacc_grid(years, technologies, renewable_targets=renewable_targets)
+        columns = ["Equity Cost", "Debt Cost"]
+        for country in ["USA", "FRA", "IND", "KEN"]:
+            for technology in technologies:
+                projections = predictor.calculate_country_projections(country, technology, years[-1], interest_rates=True, GDP_change=True, renewable_targets=renewable_targets)
+                rows = grid.loc[(grid["Country code"] == country) & (grid["Technology"] == technology)]
+                np.testing.assert_allclose(projections[columns].values.astype(float), rows[columns].values.astype(float), rtol=1e-12, equal_nan=True)
+            if renewable_targets:
+                results = predictor.calculate_technology_wacc(str(years[1]), country, technologies)
+                rows = grid.loc[(grid["Country code"] == country) & (grid["Year"] == years[1])]
+                np.testing.assert_allclose(results[columns].values.astype(float), rows[columns].values.astype(float), rtol=1e-12, equal_nan=True)
+    finally:
+        predictor.datasets.set("generation", generation)
@@ -0,0 +1,96 @@
+import sys
+import numpy as np
+import pytest
+import wacc_kernel
+from wacc_kernel import wacc_kernel as kernel, wacc_rate, wacc_jacobian, KERNEL_COLUMNS, JACOBIAN_INPUTS, KERNELS
+
+
+def kernel_inputs(size=2000, seed=0):
+
+    # Random kernel inputs over the ranges seen in the data, with some missing values
+    rng = np.random.default_rng(seed)
+    inputs = {"rf_rate": rng.uniform(0, 6, size), "crp": rng.uniform(0, 15, size), "cds": rng.uniform(0, 10, size),
+              "tax_rate": rng.uniform(0, 40, size), "erp": rng.uniform(4, 7, size), "technology_premium": rng.uniform(0, 6, size),
+              "debt_share": rng.uniform(30, 80, size), "lenders_margin": rng.uniform(1, 3, size)}
+    inputs["crp"][::97] = np.nan
+    inputs["technology_premium"][::89] = np.nan
+
+    return inputs
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+def test_backends_match(backend):
+
+    # Each backend writes the same ten columns as the NumPy kernel
+    if backend == "numba":
+        pytest.importorskip("numba")
+    inputs = kernel_inputs()
+    expected = kernel(**inputs, backend="numpy")
+    results = kernel(**{name: values.reshape(40, 50) for name, values in inputs.items()}, backend=backend)
+    assert results.shape == (len(KERNEL_COLUMNS), 40, 50)
+    np.testing.assert_allclose(results.reshape(len(KERNEL_COLUMNS), -1), expected, rtol=1e-12, equal_nan=True)
+
+
+def test_auto_falls_back_without_numba(monkeypatch):
+
+    # Without numba, "auto" uses the NumPy kernel while "numba" raises
+    monkeypatch.setitem(sys.modules, "numba", None)
+    monkeypatch.delitem(KERNELS, "numba", raising=False)
+    inputs = kernel_inputs()
+    assert wacc_kernel.select_kernel("auto") is wacc_kernel.numpy_kernel
+    np.testing.assert_array_equal(kernel(**inputs, backend="auto"), kernel(**inputs, backend="numpy"))
+    with pytest.raises(ImportError):
+        wacc_kernel.select_kernel("numba")
+    monkeypatch.delitem(KERNELS, "numba", raising=False)
+
+
+def test_unknown_backend_raises():
+
+    with pytest.raises(ValueError):
+        wacc_kernel.select_kernel("fortran")
+
+
+@pytest.mark.parametrize("name", JACOBIAN_INPUTS)
+def test_jacobian_matches_central_differences(name):
+
+    # Each analytic partial derivative matches central differences of the WACC, away from the kink at the lenders margin
+    inputs = kernel_inputs()
+    inputs = {input_name: np.nan_to_num(values, nan=1.0) for input_name, values in inputs.items()}
+    smooth = np.abs(inputs["technology_premium"] - inputs["lenders_margin"]) > 1e-3
+    step = 1e-5
+    upper = {**inputs, name: inputs[name] + step}
+    lower = {**inputs, name: inputs[name] - step}
+    differences = (wacc_rate(**upper) - wacc_rate(**lower)) / (2 * step)
+    jacobian = wacc_jacobian(**inputs)[JACOBIAN_INPUTS.index(name)]
+    np.testing.assert_allclose(jacobian[smooth], differences[smooth], rtol=1e-7, atol=1e-8)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+def test_backends_match_on_broadcast_inputs(backend):
+
+    # Scalars, rows and columns are broadcast over the country x year x technology grid without copying
+    if backend == "numba":
+        pytest.importorskip("numba")
+    rng = np.random.default_rng(1)
+    inputs = {"rf_rate": rng.uniform(0, 6, (1, 12, 1)), "crp": rng.uniform(0, 15, (30, 12, 1)), "cds": rng.uniform(0, 10, (30, 12, 1)),
+              "tax_rate": rng.uniform(0, 40, (30, 1, 1)), "erp": 5.5, "technology_premium": rng.uniform(0, 6, (30, 12, 4)),
+              "debt_share": rng.uniform(30, 80, (30, 12, 1)), "lenders_margin": 2.0}
+    expected = kernel(**{name: np.broadcast_to(values, (30, 12, 4)).copy() for name, values in inputs.items()}, backend="numpy")
+    np.testing.assert_allclose(kernel(**inputs, backend=backend), expected, rtol=1e-12)
+
+
+def test_numba_calculator_matches_numpy(predictor):
+
+    # The grid is the same with the compiled kernel as with NumPy
+    pytest.importorskip("numba")
+    grid = predictor.grid_inputs([2020, 2028], ["solar", "gas"])
+    calculator = predictor.calculator
+    backend = calculator.kernel_backend
+    try:
+        results = {}
+        for calculator.kernel_backend in ["numpy", "numba"]:
+            results[calculator.kernel_backend] = predictor.methods.get("fincore")(calculator, **grid)
+    finally:
+        calculator.kernel_backend = backend
+    for column in results["numpy"]:
+        np.testing.assert_allclose(results["numba"][column], results["numpy"][column], rtol=1e-12, equal_nan=True)
@@ -0,0 +1,21 @@
+import numpy as np
+
+
+def test_equal_weights_match_group_means(predictor):
+
+    # With equal weights, the regional WACC is the simple mean over the countries of each continent
+    regional = predictor.calculate_regional_waccs([2024], ["solar"], weights="equal").set_index("Group")["WACC"]
+    grid = predictor.calculate_wacc_grid([2024], ["solar"])
+    continents = dict(zip(predictor.inputs.countries, predictor.generation.continents))
+    means = grid.groupby(grid["Country code"].map(continents))["WACC"].mean()
+    assert np.allclose(regional.sort_index().values, means.sort_index().values)
+
+
+def test_custom_grouping_leaves_registered_groupings_unchanged(predictor):
+
+    # Ad-hoc groupings are indexed per call rather than added to the shared index
+    names = predictor.regions.names()
+    countries = predictor.inputs.countries[:6]
+    results = predictor.calculate_regional_waccs([2024], ["solar"], grouping={country: "A" if i < 3 else "B" for i, country in enumerate(countries)})
+    assert set(results["Group"]) <= {"A", "B"}
+    assert predictor.regions.names() == names
@@ -0,0 +1,22 @@
+import numpy as np
+
+
+def test_default_scenario_matches_grid(predictor):
+
+    # A scenario with the default settings reproduces the grid
+    years = [2024, 2028]
+    grid = predictor.calculate_wacc_grid(years, ["solar", "gas"])
+    scenarios = predictor.calculate_scenario_grid({"base": {}}, years, ["solar", "gas"])
+    assert np.allclose(scenarios["WACC"].values, grid["WACC"].values, equal_nan=True)
+
+
+def test_target_scenarios_move_wacc(predictor):
+
+    # Meeting the renewable targets, and exceeding them, changes the WACC of countries with targets
+    scenarios = {"base": {}, "targets met": {"renewable_targets": True}, "targets doubled": {"renewable_targets": True, "target_scale": 2}}
+    results = predictor.calculate_scenario_grid(scenarios, [2028], ["solar"]).set_index(["Scenario", "Country code"])["WACC"]
+    base = results.loc["base"]
+    for name in ["targets met", "targets doubled"]:
+        delta = (results.loc[name] - base).dropna()
+        assert (delta != 0).any()
+    assert not np.allclose(results.loc["targets met"], results.loc["targets doubled"], equal_nan=True)
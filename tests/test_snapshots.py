@@ -0,0 +1,37 @@
+import os
+import threading
+import pandas as pd
+from data_loader import SnapshotCache
+
+
+def test_same_named_sources_keep_their_snapshots(tmp_path):
+
+    # Snapshots of same-named files in different directories are kept side by side
+    snapshots = SnapshotCache(str(tmp_path / "snapshots"))
+    paths = []
+    for i, directory in enumerate(["a", "b"]):
+        os.makedirs(tmp_path / directory)
+        paths.append(str(tmp_path / directory / "data.csv"))
+        pd.DataFrame({"Value": [i]}).to_csv(paths[-1], index=False)
+    for i, path in enumerate(paths):
+        assert snapshots.read_csv(path)["Value"].tolist() == [i]
+    assert len(os.listdir(tmp_path / "snapshots")) == 2
+    for i, path in enumerate(paths):
+        assert os.path.exists(snapshots.snapshot_path(path, pd.read_csv))
+
+
+def test_concurrent_writes_leave_one_snapshot(tmp_path):
+
+    # Threads writing the same snapshot at once each use their own temporary file
+    path = str(tmp_path / "data.csv")
+    data = pd.DataFrame({"Value": range(1000)})
+    data.to_csv(path, index=False)
+    snapshots = SnapshotCache(str(tmp_path / "snapshots"))
+    snapshot_path = snapshots.snapshot_path(path, pd.read_csv)
+    threads = [threading.Thread(target=snapshots.write_snapshot, args=(data, snapshot_path)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert os.listdir(tmp_path / "snapshots") == [os.path.basename(snapshot_path)]
+    pd.testing.assert_frame_equal(pd.read_feather(snapshot_path), data)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from wacc_inputs import TargetIndex
+
+
+def test_targets_are_found_for_technology_codes(predictor):
+
+    # Technology codes are mapped onto the Ember fuel categories of the targets
+    targets = predictor.targets
+    for technology, fuel_categories in [("solar", ["Solar"]), ("onshore-wind", ["Wind", "Onshore Wind"]), ("offshore-Wind", ["Offshore Wind"]), ("hydro", ["Hydro"])]:
+        assert targets.fuel_categories(technology) == fuel_categories
+        assert np.isfinite(targets.get(technology)[0]).any()
+
+
+def test_every_technology_target_category_is_used(predictor):
+
+    # Every category of the share of generation targets is reached from a technology, apart from aggregates of several technologies
+    targets = predictor.ember_targets
+    categories = set(targets.loc[targets["metric"] == "share_of_generation_pct", "fuel_category"])
+    reached = {category for technology in predictor.tech_mappings for category in predictor.targets.fuel_categories(technology)}
+    assert categories - reached == {"Renewables", "Non-hydro renewables", "Hydro, bio and other renewables", "Rest of renewables"}
+
+
+def test_onshore_wind_targets_are_used(predictor):
+
+    # Countries whose wind target is labelled Onshore Wind get it for onshore wind, using the most recently collected target
+    targets = predictor.ember_targets
+    targets = targets.loc[targets["metric"] == "share_of_generation_pct"].sort_values("collection_year", kind="stable")
+    onshore = targets.loc[targets["fuel_category"] == "Onshore Wind"].drop_duplicates("Country code", keep="last").set_index("Country code")["value"]
+    onshore = onshore.loc[onshore.index.isin(predictor.inputs.countries)]
+    values, _ = predictor.targets.get("onshore-wind", predictor.targets.country_index.get_indexer(onshore.index))
+    assert len(onshore) > 0
+    np.testing.assert_allclose(values, onshore.values)
+
+
+def test_targets_move_penetration_and_wacc(predictor):
+
+    # A country with a solar share of generation target moves towards it, and its WACC changes
+    values, target_years = predictor.targets.get("solar")
+    position = int(np.flatnonzero(np.isfinite(values) & (target_years > predictor.recent_year + 1))[0])
+    country = predictor.inputs.countries[position]
+    years = np.arange(predictor.recent_year + 1, int(target_years[position]) + 1)
+    base = predictor.calculate_wacc_grid(years, ["solar"])
+    targeted = predictor.calculate_wacc_grid(years, ["solar"], renewable_targets=True)
+    changed = base["WACC"].values != targeted["WACC"].values
+    assert changed[(base["Country code"] == country).values].any()
+
+    # Countries without targets are unchanged
+    assert not changed[(base["Country code"].isin(predictor.inputs.countries[np.isnan(values)])).values].any()
+
+
+def test_targets_move_country_projections(predictor):
+
+    # The single-country projections follow the same targets as the grid
+    values, target_years = predictor.targets.get("solar")
+    country = predictor.inputs.countries[int(np.flatnonzero(np.isfinite(values) & (target_years > predictor.recent_year + 1))[0])]
+    base = predictor.calculate_country_projections(country, "solar", 2030)
+    targeted = predictor.calculate_country_projections(country, "solar", 2030, renewable_targets=True)
+    assert (base["WACC"].values != targeted["WACC"].values).any()
+
+
+def test_trajectory_holds_the_target_after_the_target_year():
+
+    # Penetration reaches the target in the target year and stays there, whatever the starting penetration
+    targets = pd.DataFrame({"Country code": ["AAA", "BBB"], "fuel_category": "Solar", "metric": "share_of_generation_pct",
+                            "value": [30.0, 50.0], "target_year": [2030, 2028], "collection_year": 2024})
+    index = TargetIndex(targets, ["AAA", "BBB", "CCC"])
+    years = np.arange(2026, 2035)
+    penetration = np.full((3, len(years)), 10.0)
+    trajectory = index.trajectory("Solar", penetration, years, 2025)
+    np.testing.assert_allclose(trajectory[0, years <= 2030], 10 + (years[years <= 2030] - 2025) * 4)
+    np.testing.assert_allclose(trajectory[0, years >= 2030], 30)
+    np.testing.assert_allclose(trajectory[1, years >= 2028], 50)
+    np.testing.assert_allclose(trajectory[2], 10)
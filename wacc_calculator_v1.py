@@ -1,25 +1,33 @@
-import xarray as xr
 import pandas as pd
 import numpy as np
-import streamlit as st
+from wacc_kernel import wacc_kernel, wacc_rate, wacc_jacobian, KERNEL_COLUMNS, JACOBIAN_INPUTS
 
 class WaccCalculator:
-    def __init__(self, tech_premiums, penetration_boundaries, maturity_premiums):
+
+    # Output columns of the WACC calculation, after the country code
+    RESULT_COLUMNS = KERNEL_COLUMNS
+
+    def __init__(self, tech_premiums, penetration_boundaries, maturity_premiums, snapshots=None, kernel_backend="auto"):
         """ Initialises the WACC Calculator Class, which is used to calculate an estimate of the cost of capital at
          a national level for countries with available data for a specific technology
         
         Inputs:
         tech_premiums: CSV containing mapping of relative tech premiums, measured compared to solar
+        snapshots: optional SnapshotCache used to read the CSVs
+        kernel_backend: backend of the WACC kernel ("auto" uses a JIT-compiled kernel if numba is installed, "numpy" or "numba")
         
         """
     
         # Read in relevant inputs
-        self.tech_premiums = pd.read_csv(tech_premiums)
-        self.penetration_boundaries = pd.read_csv(penetration_boundaries)
-        self.maturity_premiums = pd.read_csv(maturity_premiums)
+        read_csv = pd.read_csv if snapshots is None else snapshots.read_csv
+        self.tech_premiums = read_csv(tech_premiums)
+        self.penetration_boundaries = read_csv(penetration_boundaries)
+        self.maturity_premiums = read_csv(maturity_premiums)
 
         # Set up initial assumptions
         self.lenders_margin = 2
+        self.kernel_backend = kernel_backend
+        self.parameter_cache = {}
         
 
     def calculate_country_wacc(self, rf_rate, crp, cds, tax_rate, technology, year, debt_share=None, erp=None, tech_penetration=None, market_maturity=None, country_code=None):
@@ -35,10 +43,7 @@ class WaccCalculator:
             technology_premium = technology_premium
         else:
             technology_premium = technology_premium + relative_premium
-        lenders_margin = self.lenders_margin
-        technology_premium_debt = (technology_premium - self.lenders_margin).clip(lower=0)
 
-            
 
         # Extract country code
         if country_code is None:
@@ -56,33 +61,23 @@ class WaccCalculator:
         if debt_share is None:
             debt_share = self.calculate_debt_share(crp)
 
+        # Calculate WACC and contributions
+        results_df = self.wacc_results(rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, country_code, year)
 
-        # Calculate the cost of equity
-        debt_cost = rf_rate + cds + lenders_margin + technology_premium_debt
-
-        # Calculate the cost of debt
-        equity_cost = rf_rate + crp + erp + technology_premium
-
-        # Calculate the weighted average cost of capital
-        estimated_wacc = debt_cost * (debt_share/100) * (1 - (tax_rate/100)) + equity_cost * (1 - (debt_share/100))
+        return results_df
+    
 
-        # Extract contributions to the overall WACC
-        risk_free_contributions = rf_rate*((debt_share / 100 * (1 - tax_rate/100)) + (1 - debt_share / 100))
-        crp_contributions = cds*(debt_share / 100 * (1 - tax_rate/100)) + crp*(1 - debt_share / 100)
-        erp_contributions = erp * ( 1 - (debt_share / 100))
-        lm_contributions = lenders_margin * (debt_share / 100) * (1-tax_rate/100)
-        tech_premium_contributions = (technology_premium_debt*(debt_share / 100 * (1 - tax_rate/100)) + technology_premium*(1 - debt_share / 100))
+    def calculate_maturity_tech_premium(self, technology, tech_penetration):
 
+        # Calculate the maturity and tech premium from the penetration
+        maturity, tech_premium = self.evaluate_maturity_premium(technology, tech_penetration["Penetration"].values)
 
-        # Include in a pandas dataframe
-        results_df = pd.DataFrame(data={"Country code": country_code, "Risk Free":risk_free_contributions, "Country Risk": crp_contributions, "Equity Risk": erp_contributions, "Lenders Margin": lm_contributions, 
-                                        "Technology Risk": tech_premium_contributions, "Equity Cost": equity_cost, "Debt Cost": debt_cost, "WACC": estimated_wacc, "Debt Share": debt_share, "Tax Rate": tax_rate, "Year":year})
-        
+        # Return a copy of the penetration data with the results added
+        tech_penetration = tech_penetration.assign(**{"Maturity": maturity, "Tech Premium": tech_premium})
 
-        return results_df
-    
+        return tech_penetration
 
-    def calculate_maturity_tech_premium(self, technology, tech_penetration):
+    def maturity_parameters(self, technology):
 
         # Extract boundaries for the given technology
         tech_boundaries = self.penetration_boundaries
@@ -102,35 +97,111 @@ class WaccCalculator:
 
         # Establish the premiums
         maturity_premium = maturity_premium_selected["MATURE"].values[0]
-        intermediate_premium = maturity_premium_selected["INTERMEDIATE"].values[0]
         immature_premium = maturity_premium_selected["IMMATURE"].values[0]
-        
 
-        # Calculate the maturity based on boundaries
-        tech_penetration["Maturity"] = tech_penetration.apply(
-            lambda row: "Mature" if row["Penetration"] > mature 
-            else ("Intermediate"if row["Penetration"] > intermediate
-                else "Immature"),
-            axis=1
-            ) 
-        
-        # Calculate the intermediate premium
-        tech_penetration["Intermediate"]= (maturity_premium - immature_premium)/(mature - intermediate)*(tech_penetration["Penetration"]-intermediate) + immature_premium
-        
-        tech_penetration["Tech Premium"] = tech_penetration.apply(
-            lambda row: maturity_premium if row["Maturity"] == "Mature"
-            else (row["Intermediate"] if row["Maturity"] == "Intermediate"
-                else immature_premium),
-            axis=1
-            )
-        tech_penetration = tech_penetration.drop(columns=["Intermediate"])
+        return intermediate, mature, maturity_premium, immature_premium
 
-        return tech_penetration
+    def evaluate_maturity_premium(self, technology, tech_penetration, market_maturity=None):
+
+        # Extract the boundaries and premiums
+        intermediate, mature, maturity_premium, immature_premium = self.maturity_parameters(technology)
+        tech_penetration = np.asarray(tech_penetration, dtype=float)
+
+        # Calculate the maturity based on boundaries, unless specified
+        maturity = np.where(tech_penetration > mature, "Mature", np.where(tech_penetration > intermediate, "Intermediate", "Immature"))
+        if market_maturity is not None:
+            maturity = np.full(maturity.shape, market_maturity)
+
+        # Calculate the tech premium, interpolating between the boundaries for intermediate markets
+        intermediate_premium = (maturity_premium - immature_premium)/(mature - intermediate)*(tech_penetration-intermediate) + immature_premium
+        tech_premium = np.where(maturity == "Mature", maturity_premium, np.where(maturity == "Intermediate", intermediate_premium, immature_premium))
+
+        return maturity, tech_premium
     
+    def technology_premium_grid(self, technologies, tech_penetration):
+
+        # Boundaries, premiums and relative premiums for each technology, along the last axis
+        intermediate, mature, maturity_premium, immature_premium, relative_premium = self.technology_parameter_grid(technologies)
+
+        return self.interpolate_premium(tech_penetration, intermediate, mature, maturity_premium, immature_premium) + relative_premium
+
+    def technology_parameter_grid(self, technologies):
+
+        # Boundaries, maturity premiums and relative premium of each technology, as five arrays
+        return np.array([self.technology_parameters(technology) for technology in technologies], dtype=float).reshape(-1, 5).T
+
+    def interpolate_premium(self, tech_penetration, intermediate, mature, maturity_premium, immature_premium):
+
+        # Calculate the tech premium, interpolating between the boundaries for intermediate markets
+        intermediate_premium = (maturity_premium - immature_premium)/(mature - intermediate)*(tech_penetration-intermediate) + immature_premium
+        technology_premium = np.where(tech_penetration > mature, maturity_premium, np.where(tech_penetration > intermediate, intermediate_premium, immature_premium))
+
+        return technology_premium
+
+    def technology_parameters(self, technology):
+
+        # Boundaries, maturity premiums and relative premium of a technology, cached on first use
+        if technology not in self.parameter_cache:
+            relative_premium = self.lookup_tech_premium(technology)
+            if technology in ["Wind", "Wind Offshore", "Solar"]:
+                relative_premium = 0
+            self.parameter_cache[technology] = self.maturity_parameters(technology) + (relative_premium,)
+
+        return self.parameter_cache[technology]
+
+    def calculate_wacc_components(self, rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin=None, out=None):
+
+        # Evaluate the WACC and contributions on broadcastable arrays, in a single pass of the kernel
+        if lenders_margin is None:
+            lenders_margin = self.lenders_margin
+        out = wacc_kernel(rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin, out=out, backend=self.kernel_backend)
+
+        return dict(zip(self.RESULT_COLUMNS, out))
+
+    def calculate_wacc_rate(self, rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin=None):
+
+        # Evaluate the WACC alone on broadcastable arrays, for when the contributions are not needed
+        if lenders_margin is None:
+            lenders_margin = self.lenders_margin
+
+        return wacc_rate(rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin)
+
+    def calculate_wacc_jacobian(self, rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin=None):
+
+        # Analytic partial derivatives of the WACC with respect to each input, on broadcastable arrays
+        if lenders_margin is None:
+            lenders_margin = self.lenders_margin
+        out = wacc_jacobian(rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin)
+
+        return dict(zip(JACOBIAN_INPUTS, out))
+
+    def wacc_results(self, rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, country_code, year):
+
+        # Align any series inputs on a common index, as pandas arithmetic would
+        inputs = [rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share]
+        indices = [value.index for value in inputs if isinstance(value, pd.Series)]
+        index = indices[0]
+        for other_index in indices[1:]:
+            if not other_index.equals(index):
+                index = index.union(other_index)
+        inputs = [value.reindex(index).values if isinstance(value, pd.Series) else value for value in inputs]
+        if isinstance(country_code, pd.Series):
+            country_code = country_code.reindex(index)
+
+        # Calculate WACC and contributions
+        results = self.calculate_wacc_components(*inputs)
+
+        # Include in a pandas dataframe
+        results_df = pd.DataFrame(data={"Country code": country_code, **results, "Year": year}, index=index)
+
+        return results_df
+
     def calculate_debt_share(self, crp, max_crp=None):
 
         # Calculate debt share based on CRP, assuming it ranges in line with CRP data
-        debt_share = 80 - 40 * (crp / np.nanmax(crp))
+        if max_crp is None:
+            max_crp = np.nanmax(crp)
+        debt_share = 80 - 40 * (crp / max_crp)
 
         return debt_share
     
@@ -155,6 +226,15 @@ class WaccCalculator:
         
         return relative_premium
 
+    def technology_name(self, technology):
+
+        # Map a technology code to its full name, keeping unmapped technologies as they are
+        names = self.tech_premiums.loc[self.tech_premiums["TECH"]==technology, "NAME"]
+        if len(names) == 0:
+            return technology
+
+        return names.values[0]
+
 
 
     def calculate_wacc_individual(self, rf_rate, crp, cds, tax_rate, technology, year, country_code, tech_penetration, debt_share=None, erp=None, market_maturity=None, penetration_value=None):
@@ -172,35 +252,13 @@ class WaccCalculator:
             technology_premium = technology_premium
         else:
             technology_premium = technology_premium + relative_premium
-        lenders_margin = self.lenders_margin
-        technology_premium_debt = (technology_premium - self.lenders_margin).clip(lower=0)
 
-        
         # Calculate debt share, if applicable
         if debt_share is None:
             debt_share = self.calculate_debt_share_individual(crp)
 
-        # Calculate the cost of equity
-        debt_cost = rf_rate + cds + lenders_margin + technology_premium_debt
-
-        # Calculate the cost of debt
-        equity_cost = rf_rate + crp + erp + technology_premium
-
-        # Calculate the weighted average cost of capital
-        estimated_wacc = debt_cost * (debt_share/100) * (1 - (tax_rate/100)) + equity_cost * (1 - (debt_share/100))
-
-        # Extract contributions to the overall WACC
-        risk_free_contributions = rf_rate*((debt_share / 100 * (1 - tax_rate/100)) + (1 - debt_share / 100))
-        crp_contributions = cds*(debt_share / 100 * (1 - tax_rate/100)) + crp*(1 - debt_share / 100)
-        erp_contributions = erp * ( 1 - (debt_share / 100))
-        lm_contributions = lenders_margin * (debt_share / 100) * (1-tax_rate/100)
-        tech_premium_contributions = (technology_premium_debt*(debt_share / 100 * (1 - tax_rate/100)) + technology_premium*(1 - debt_share / 100))
-
-
-        # Include in a pandas dataframe
-        results_df = pd.DataFrame(data={"Country code": country_code, "Risk Free":risk_free_contributions, "Country Risk": crp_contributions, "Equity Risk": erp_contributions, "Lenders Margin": lm_contributions, 
-                                        "Technology Risk": tech_premium_contributions, "Equity Cost": equity_cost, "Debt Cost": debt_cost, "WACC": estimated_wacc, "Debt Share": debt_share, "Tax Rate": tax_rate, "Year":year})
-        
+        # Calculate WACC and contributions
+        results_df = self.wacc_results(rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, country_code, year)
 
         return results_df
     
@@ -213,47 +271,7 @@ class WaccCalculator:
 
     def tech_premium_individual(self, technology, tech_penetration, market_maturity=None):
 
-        # Extract boundaries for the given technology
-        tech_boundaries = self.penetration_boundaries
-        maturity_premiums = self.maturity_premiums
-        
-        # Check if technology has specific boundaries
-        if tech_boundaries["TECH"].isin([technology]).any():
-            tech_boundaries_selected = tech_boundaries.loc[tech_boundaries["TECH"]==technology]
-            maturity_premium_selected = maturity_premiums.loc[maturity_premiums["TECH"]==technology]
-        else:
-            tech_boundaries_selected = tech_boundaries.loc[tech_boundaries["TECH"]=="Other"]
-            maturity_premium_selected = maturity_premiums.loc[maturity_premiums["TECH"]=="Other"]
-
-        # Establish the boundaries
-        intermediate = tech_boundaries_selected["INTERMEDIATE"].values[0]
-        mature = tech_boundaries_selected["MATURE"].values[0]
-
-        # Establish the premiums
-        maturity_premium = maturity_premium_selected["MATURE"].values[0]
-        intermediate_premium = maturity_premium_selected["INTERMEDIATE"].values[0]
-        immature_premium = maturity_premium_selected["IMMATURE"].values[0]
-        
-
-        # Calculate the maturity based on boundaries
-        if tech_penetration > mature:
-            maturity = "Mature"
-        elif tech_penetration > intermediate:
-            maturity = "Intermediate"
-        else:
-            maturity = "Immature"
-
-        # If maturity is specified, take that
-        if market_maturity is not None:
-            maturity = market_maturity
-
-        # Calculate tech premiunm
-        if maturity == "Mature":
-            tech_premium = maturity_premium
-        elif maturity == "Intermediate":
-            tech_premium = (maturity_premium - immature_premium)/(mature - intermediate)*(tech_penetration-intermediate) + immature_premium
-        else:
-            tech_premium = immature_premium
-
+        # Calculate tech premium
+        maturity, tech_premium = self.evaluate_maturity_premium(technology, tech_penetration, market_maturity=market_maturity)
 
-        return tech_premium
\ No newline at end of file
+        return tech_premium[()]
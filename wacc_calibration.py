@@ -0,0 +1,278 @@
+import numpy as np
+import pandas as pd
+
+
+def read_observations(iea_data="./DATA/IEACoCData.csv", irena_data="./DATA/IRENA_DATA.csv", iea_ranges=None, irena_year=2022):
+
+    # Observed WACCs from the IEA Cost of Capital Observatory, in percent
+    observations = []
+    if iea_data is not None:
+        iea = pd.read_csv(iea_data)
+        iea = iea.assign(Source="IEA", Technology=iea["Technology"].map({"Solar": "solar"}))
+        observations.append(iea[["Source", "Country code", "Year", "Technology", "WACC"]])
+
+    # Observed WACCs from IRENA, given as fractions for a single year
+    if irena_data is not None:
+        irena = pd.read_csv(irena_data, encoding="latin1")
+        irena = irena.melt(id_vars="Country code", value_vars=["onshore wacc", "offshore wacc", "solar pv wacc"], var_name="Technology", value_name="WACC")
+        irena = irena.assign(Source="IRENA", Year=irena_year, WACC=irena["WACC"] * 100,
+                             Technology=irena["Technology"].map({"onshore wacc": "onshore-wind", "offshore wacc": "offshore-Wind", "solar pv wacc": "solar"}))
+        observations.append(irena[["Source", "Country code", "Year", "Technology", "WACC"]])
+
+    # Midpoints of the IEA ranges for solar in 2022, if selected, skipping inconsistent ranges
+    if iea_ranges is not None:
+        ranges = pd.read_csv(iea_ranges)
+        ranges = ranges.loc[ranges["WACC_Solar_Max_2022"] >= ranges["WACC_Solar_Min_2022"]]
+        ranges = ranges.assign(Source="IEA ranges", Year=2022, Technology="solar",
+                               WACC=(ranges["WACC_Solar_Min_2022"] + ranges["WACC_Solar_Max_2022"]) * 50)
+        observations.append(ranges[["Source", "Country code", "Year", "Technology", "WACC"]])
+
+    # Keep complete observations
+    observations = pd.concat(observations, ignore_index=True).dropna(subset=["Country code", "Technology", "WACC"])
+    observations["Year"] = observations["Year"].astype(int)
+
+    return observations.reset_index(drop=True)
+
+
+def nelder_mead(loss, initial, lower, upper, max_evaluations=20000, tolerance=1e-10):
+
+    # Minimise the loss with the Nelder-Mead simplex, keeping points within the bounds
+    clip = lambda point: np.clip(point, lower, upper)
+    steps = np.where(initial != 0, 0.1 * np.abs(initial), 0.1)
+    simplex = np.vstack([initial] + [clip(initial + np.eye(len(initial))[i] * steps[i]) for i in range(len(initial))])
+    values = np.array([loss(point) for point in simplex])
+    evaluations = len(simplex)
+
+    while evaluations < max_evaluations:
+
+        # Order the simplex, stopping once the values have converged
+        order = np.argsort(values)
+        simplex, values = simplex[order], values[order]
+        if values[-1] - values[0] <= tolerance * (abs(values[0]) + tolerance):
+            break
+        centroid = simplex[:-1].mean(axis=0)
+
+        # Reflect the worst point, expanding or contracting as required
+        reflected = clip(centroid + (centroid - simplex[-1]))
+        reflected_value = loss(reflected)
+        evaluations += 1
+        if reflected_value < values[0]:
+            expanded = clip(centroid + 2 * (centroid - simplex[-1]))
+            expanded_value = loss(expanded)
+            evaluations += 1
+            simplex[-1], values[-1] = (expanded, expanded_value) if expanded_value < reflected_value else (reflected, reflected_value)
+        elif reflected_value < values[-2]:
+            simplex[-1], values[-1] = reflected, reflected_value
+        else:
+            contracted = clip(centroid + 0.5 * (simplex[-1] - centroid))
+            contracted_value = loss(contracted)
+            evaluations += 1
+            if contracted_value < values[-1]:
+                simplex[-1], values[-1] = contracted, contracted_value
+            else:
+                # Shrink towards the best point
+                simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
+                values[1:] = [loss(point) for point in simplex[1:]]
+                evaluations += len(simplex) - 1
+
+    best = np.argmin(values)
+
+    return simplex[best], values[best], evaluations
+
+
+class Calibrator:
+    def __init__(self, predictor, observations=None, parameters=None, balance_sources=True):
+        """ Initialises the Calibrator Class, which fits the hand-set parameters of the WACC calculation to observed costs
+        of capital by minimising the squared error of the modelled WACC
+
+        Inputs:
+        Predictor - WaccPredictor providing the inputs and the WaccCalculator whose parameters are fitted
+        Observations - dataframe of observed WACCs (%) with columns Source, Country code, Year, Technology (code) and WACC,
+        by default the IEA and IRENA data read by read_observations. Steffen_CoC_2020.csv lists coverage only, so its
+        values need to be supplied here to be used
+        Parameters - list of parameters to fit, by default the lenders margin, the maturity premiums and penetration boundaries
+        used by the observed technologies, and the relative premiums of the observed technologies other than solar, which is
+        the reference. Parameters are named "lenders_margin", "immature_premium[ROW]", "mature_premium[ROW]",
+        "intermediate_boundary[ROW]", "mature_boundary[ROW]" (ROW from MaturityPremiums.csv / TechBoundaries.csv) and
+        "relative_premium[TECH]" (TECH from TechPremiums.csv)
+        Balance_sources - weight each source equally in the loss, rather than each observation
+
+        The inputs of each observation are extracted once, so that the loss is evaluated on arrays without reading data.
+        """
+
+        self.predictor = predictor
+        self.calculator = predictor.calculator
+        self.balance_sources = balance_sources
+        observations = read_observations() if observations is None else observations
+
+        # Extract the grid inputs for the observed years and technologies
+        years = np.sort(observations["Year"].unique())
+        self.technologies = sorted(observations["Technology"].unique())
+        grid = predictor.grid_inputs(years, self.technologies)
+        with np.errstate(invalid="ignore"):
+            debt_share = self.calculator.calculate_debt_share(grid["crp"], max_crp=np.nanmax(grid["crp"], axis=0))
+
+        # Locate the cell of each observation, keeping observations that can be modelled
+        country = pd.Index(predictor.inputs.countries).get_indexer(observations["Country code"])
+        year = np.searchsorted(years, observations["Year"].values)
+        technology = pd.Index(self.technologies).get_indexer(observations["Technology"])
+        cells = {"rf_rate": grid["rf_rate"], "crp": grid["crp"], "cds": grid["cds"], "tax_rate": grid["tax_rate"], "erp": grid["erp"],
+                 "debt_share": debt_share, "penetration": grid["penetration"]}
+        cells = {name: np.broadcast_to(values, grid["penetration"].shape)[np.maximum(country, 0), year, np.maximum(technology, 0)] for name, values in cells.items()}
+        keep = (country >= 0) & np.isfinite(np.column_stack([cells[name] for name in ["rf_rate", "crp", "cds", "tax_rate", "erp", "debt_share"]])).all(axis=1)
+        self.cells = {name: values[keep] for name, values in cells.items()}
+        self.observations = observations.loc[keep].reset_index(drop=True)
+        self.dropped = int((~keep).sum())
+        self.observed = self.observations["WACC"].values.astype(float)
+        self.technology_positions = technology[keep]
+
+        # Weight observations so that each source contributes equally, if selected
+        counts = self.observations["Source"].map(self.observations["Source"].value_counts()).values
+        self.weights = 1 / counts if balance_sources else np.ones(len(self.observations))
+        self.weights = self.weights / self.weights.sum()
+
+        # Map each observed technology to its rows of the maturity premiums and penetration boundaries
+        self.rows = [self.maturity_row(technology) for technology in self.technologies]
+        self.row_names = sorted(set(self.rows))
+        self.row_positions = np.array([self.row_names.index(row) for row in self.rows])[self.technology_positions]
+
+        # Set up the parameters, starting from the current values
+        self.values = self.current_values()
+        if parameters is None:
+            parameters = ["lenders_margin"] + [name + "[" + row + "]" for row in self.row_names for name in ["immature_premium", "mature_premium", "intermediate_boundary", "mature_boundary"]]
+            parameters = parameters + ["relative_premium[" + technology + "]" for technology in self.technologies if technology != "solar"]
+        unknown = set(parameters) - set(self.values)
+        if unknown:
+            raise ValueError("Unknown calibration parameters: " + ", ".join(sorted(unknown)))
+        self.parameters = list(parameters)
+        self.initial = np.array([self.values[parameter] for parameter in self.parameters])
+        self.lower, self.upper = np.array([self.bounds(parameter) for parameter in self.parameters]).T
+        self.fitted = None
+        self.fitted_loss = None
+
+    def maturity_row(self, technology):
+
+        # Row of the maturity premiums and penetration boundaries used for a technology, as in WaccCalculator.maturity_parameters
+        if self.calculator.penetration_boundaries["TECH"].isin([technology]).any():
+            return technology
+        return "Other"
+
+    def current_values(self):
+
+        # Current values of every parameter that can be fitted
+        values = {"lenders_margin": float(self.calculator.lenders_margin)}
+        for technology, row in zip(self.technologies, self.rows):
+            intermediate, mature, maturity_premium, immature_premium, relative_premium = self.calculator.technology_parameters(technology)
+            values.update({"immature_premium[" + row + "]": float(immature_premium), "mature_premium[" + row + "]": float(maturity_premium),
+                           "intermediate_boundary[" + row + "]": float(intermediate), "mature_boundary[" + row + "]": float(mature),
+                           "relative_premium[" + technology + "]": float(relative_premium)})
+
+        return values
+
+    def bounds(self, parameter):
+
+        # Bounds of each parameter, keeping premiums, margins and boundaries non-negative
+        if parameter.startswith("relative_premium"):
+            return -5.0, 10.0
+        if "boundary" in parameter:
+            return 0.0, 100.0
+
+        return 0.0, 10.0
+
+    def parameter_arrays(self, point):
+
+        # Expand a point of the fitted parameters into the arrays used by the model
+        values = {**self.values, **dict(zip(self.parameters, point))}
+        rows = {name: np.array([values[name + "[" + row + "]"] for row in self.row_names]) for name in ["immature_premium", "mature_premium", "intermediate_boundary", "mature_boundary"]}
+        relative_premium = np.array([values["relative_premium[" + technology + "]"] for technology in self.technologies])
+
+        return values["lenders_margin"], rows, relative_premium
+
+    def model(self, point=None):
+
+        # Modelled WACC for each observation, for the given parameters (current values by default)
+        point = self.initial if point is None else point
+        lenders_margin, rows, relative_premium = self.parameter_arrays(point)
+        row = self.row_positions
+        technology_premium = self.calculator.interpolate_premium(self.cells["penetration"], rows["intermediate_boundary"][row], rows["mature_boundary"][row],
+                                                                 rows["mature_premium"][row], rows["immature_premium"][row]) + relative_premium[self.technology_positions]
+
+        return self.calculator.calculate_wacc_rate(rf_rate=self.cells["rf_rate"], crp=self.cells["crp"], cds=self.cells["cds"], tax_rate=self.cells["tax_rate"],
+                                                   erp=self.cells["erp"], technology_premium=technology_premium, debt_share=self.cells["debt_share"],
+                                                   lenders_margin=lenders_margin)
+
+    def loss(self, point):
+
+        # Weighted mean squared error of the modelled WACC, rejecting intermediate boundaries above the mature boundaries
+        lenders_margin, rows, relative_premium = self.parameter_arrays(point)
+        if (rows["intermediate_boundary"] >= rows["mature_boundary"]).any():
+            return np.inf
+
+        return float(np.dot(self.weights, (self.model(point) - self.observed) ** 2))
+
+    def calibrate(self, max_evaluations=20000, tolerance=1e-10, restarts=3):
+
+        # Fit the parameters with a bounded Nelder-Mead search from the current values, restarting from the best point found
+        self.fitted, loss, self.evaluations = nelder_mead(self.loss, self.initial, self.lower, self.upper, max_evaluations=max_evaluations, tolerance=tolerance)
+        for restart in range(restarts):
+            fitted, restart_loss, evaluations = nelder_mead(self.loss, self.fitted, self.lower, self.upper, max_evaluations=max_evaluations, tolerance=tolerance)
+            self.evaluations += evaluations
+            improved = restart_loss < loss - tolerance * abs(loss)
+            if restart_loss < loss:
+                self.fitted, loss = fitted, restart_loss
+            if not improved:
+                break
+        self.fitted_loss = loss
+
+        # Report the initial and fitted values
+        results = pd.DataFrame({"Parameter": self.parameters, "Initial": self.initial, "Fitted": self.fitted, "Lower": self.lower, "Upper": self.upper})
+
+        return results
+
+    def residuals(self):
+
+        # Modelled WACC and residual for each observation, before and after calibration
+        results = self.observations.assign(**{"Initial WACC": self.model(self.initial)})
+        results["Initial Residual"] = results["Initial WACC"] - results["WACC"]
+        if self.fitted is not None:
+            results["Fitted WACC"] = self.model(self.fitted)
+            results["Fitted Residual"] = results["Fitted WACC"] - results["WACC"]
+
+        return results
+
+    def source_report(self):
+
+        # Bias and root mean squared error of the residuals for each source
+        residuals = self.residuals()
+        columns = [column for column in residuals.columns if column.endswith("Residual")]
+        report = residuals.groupby("Source")[columns].agg(["mean", lambda values: np.sqrt(np.mean(values ** 2))])
+        report.columns = [column + (" Bias" if statistic == "mean" else " RMSE") for column, statistic in report.columns]
+        report.insert(0, "Observations", residuals.groupby("Source").size())
+
+        return report
+
+    def apply(self):
+        """ Writes the fitted values into the predictor's calculator. This permanently changes its lenders margin, maturity
+        premiums, penetration boundaries and technology premiums, including for every other user of a shared (cached) predictor
+        """
+
+        # Check that the parameters have been fitted
+        if self.fitted is None:
+            raise RuntimeError("call calibrate() first")
+
+        # Write the fitted values into the calculator's tables
+        lenders_margin, rows, relative_premium = self.parameter_arrays(self.fitted)
+        calculator = self.calculator
+        calculator.lenders_margin = lenders_margin
+        calculator.maturity_premiums = calculator.maturity_premiums.astype({"IMMATURE": float, "MATURE": float})
+        calculator.penetration_boundaries = calculator.penetration_boundaries.astype({"INTERMEDIATE": float, "MATURE": float})
+        calculator.tech_premiums = calculator.tech_premiums.astype({"PREMIUM": float})
+        for i, row in enumerate(self.row_names):
+            calculator.maturity_premiums.loc[calculator.maturity_premiums["TECH"] == row, ["IMMATURE", "MATURE"]] = [rows["immature_premium"][i], rows["mature_premium"][i]]
+            calculator.penetration_boundaries.loc[calculator.penetration_boundaries["TECH"] == row, ["INTERMEDIATE", "MATURE"]] = [rows["intermediate_boundary"][i], rows["mature_boundary"][i]]
+        for technology, premium in zip(self.technologies, relative_premium):
+            if "relative_premium[" + technology + "]" in self.parameters:
+                calculator.tech_premiums.loc[calculator.tech_premiums["TECH"] == technology, "PREMIUM"] = premium
+
+        # Clear cached parameters, so that later calculations use the fitted values
+        calculator.parameter_cache.clear()
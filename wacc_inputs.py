@@ -0,0 +1,524 @@
+import pandas as pd
+import numpy as np
+
+
+class InputCube:
+
+    # Variables held in the cube
+    VARIABLES = ["rf_rate", "crp", "cds", "tax_rate", "gdp_per_capita", "erp"]
+
+    def __init__(self, crp_data, cds_data, tax_data, ir_data, imf_data):
+        """ Initialises the InputCube Class, which aligns the macroeconomic inputs to the WACC calculation into a single
+        country x year x variable array, so that each calculation can read its inputs by position
+
+        Inputs:
+        Crp_data - Country Risk Premiums by year from the collated Damodaran data, including the ERP row
+        Cds_data - Ratings-based default spreads by year from the collated Damodaran data
+        Tax_data - Corporate Tax Rates for individual countries by year
+        Ir_data - Long term U.S. interest rates (proxy for risk free rate)
+        Imf_data - Projections for GDP per capita from the IMF's WEO
+
+        The country axis follows the order of the CRP data, with the ERP row held as a variable. Country-independent
+        variables (rf_rate, erp) are broadcast across countries. Tax rates missing for a country are set to 0.
+        """
+
+        # Set up the country axis, following the CRP data
+        countries = crp_data.loc[crp_data["Country code"] != "ERP"]
+        self.countries = countries["Country code"].values.astype(str)
+        self.country_names = countries["Country"].values
+        self.row_labels = countries.index.values
+        self.country_index = pd.Index(self.countries)
+
+        # Set up the year axis, covering every year in the inputs
+        sources = {"rf_rate": ir_data, "crp": crp_data, "cds": cds_data, "tax_rate": tax_data, "gdp_per_capita": imf_data, "erp": crp_data}
+        self.coverage = {variable: set(self.year_columns(data)) for variable, data in sources.items()}
+        covered_years = set().union(*self.coverage.values())
+        self.years = np.arange(min(covered_years), max(covered_years) + 1)
+        self.year_index = {year: i for i, year in enumerate(self.years)}
+        self.variable_index = {variable: i for i, variable in enumerate(self.VARIABLES)}
+
+        # Fill the cube
+        self.values = np.full((len(self.countries), len(self.years), len(self.VARIABLES)), np.nan)
+        self.fill_countries("crp", crp_data)
+        self.fill_countries("cds", cds_data)
+        self.fill_countries("tax_rate", tax_data, fill_value=0)
+        self.fill_countries("gdp_per_capita", imf_data)
+        self.fill_years("rf_rate", ir_data.loc[ir_data["Country code"] == "USA"])
+        self.fill_years("erp", crp_data.loc[crp_data["Country code"] == "ERP"])
+
+    def year_columns(self, data):
+
+        return [int(column) for column in data.columns if str(column).isdigit()]
+
+    def fill_countries(self, variable, data, fill_value=None):
+
+        # Align rows by country code, taking the first row for each code
+        data = data.loc[data["Country code"].notna()].drop_duplicates(subset="Country code")
+        positions = pd.Index(data["Country code"].astype(str)).get_indexer(self.countries)
+        present = positions >= 0
+
+        # Copy each year column into the cube
+        for column in data.columns:
+            if not str(column).isdigit() or int(column) not in self.year_index:
+                continue
+            values = np.full(len(self.countries), np.nan)
+            values[present] = pd.to_numeric(data[column], errors="coerce").values[positions[present]]
+            if fill_value is not None:
+                values = np.where(np.isnan(values), fill_value, values)
+            self.values[:, self.year_index[int(column)], self.variable_index[variable]] = values
+
+    def fill_years(self, variable, data):
+
+        # Broadcast a single row across all countries
+        for column in data.columns:
+            if str(column).isdigit() and int(column) in self.year_index:
+                self.values[:, self.year_index[int(column)], self.variable_index[variable]] = float(data[column].values[0])
+
+    def year_position(self, variable, year):
+
+        # Locate the year, raising a KeyError if the variable has no data for it
+        year = int(year)
+        if year not in self.coverage[variable]:
+            raise KeyError(str(year))
+
+        return self.year_index[year]
+
+    def country_positions(self, country_codes):
+
+        # Positions of the given country codes, with -1 for codes not in the cube
+        return self.country_index.get_indexer(np.atleast_1d(country_codes))
+
+    def locate(self, country_code):
+
+        # Position of a single country as an array of length one, or empty if not present
+        return np.flatnonzero(self.countries == country_code)
+
+    def get(self, variable, year, positions=None):
+
+        # Extract the values of a variable for a given year across countries
+        values = self.values[:, self.year_position(variable, year), self.variable_index[variable]]
+        if positions is not None:
+            values = values[positions]
+
+        return values
+
+    def country_values(self, variable, years, position):
+
+        # Extract the values of a variable for a single country across several years
+        year_positions = [self.year_position(variable, year) for year in years]
+
+        return self.values[position, year_positions, self.variable_index[variable]]
+
+    def year_values(self, variable, years):
+
+        # Extract a country-independent variable (rf_rate, erp) for several years
+        return self.country_values(variable, years, 0)
+
+    def year_value(self, variable, year):
+
+        # Extract a country-independent variable (rf_rate, erp) for a given year
+        return self.values[0, self.year_position(variable, year), self.variable_index[variable]]
+
+    def memory_usage(self):
+
+        return self.values.nbytes
+
+    def compact(self):
+
+        # Store the values as float32
+        self.values = self.values.astype(np.float32)
+
+        return self
+
+    def to_xarray(self):
+
+        # Convert to a labelled xarray DataArray, importing xarray only when requested
+        import xarray as xr
+
+        return xr.DataArray(self.values, dims=["country", "year", "variable"],
+                            coords={"country": self.countries, "year": self.years, "variable": self.VARIABLES})
+
+
+class GenerationIndex:
+
+    # Ember series held in the index, with their category and unit
+    SERIES = {"Penetration": ("Electricity generation", "%"), "Capacity": ("Capacity", "GW"), "Generation": ("Electricity generation", "TWh")}
+
+    def __init__(self, generation_data, countries, max_lookback=1):
+        """ Initialises the GenerationIndex Class, which pivots the Ember yearly data once into dense country x year x variable
+        arrays of penetration, capacity and generation, together with their year-on-year changes
+
+        Inputs:
+        Generation_data - Ember Yearly Generation Data in long format
+        Countries - country codes defining the country axis, normally those of the InputCube
+        Max_lookback - maximum number of years over which missing penetration is filled from the latest earlier value
+
+        Cells without an Ember row are NaN. The present arrays record which cells had a row in the source data. Penetration
+        used in the WACC calculation is forward-filled once along the year axis (continuing max_lookback years past the
+        data), with the imputed mask recording the filled cells. Cells that still have no value are set to 0.
+        """
+
+        # Set up the axes
+        self.countries = np.asarray(countries)
+        self.country_index = pd.Index(self.countries)
+        years = generation_data["Year"].values.astype(int)
+        self.years = np.arange(years.min(), years.max() + 1)
+        self.variables = np.array(sorted(set(generation_data["Variable"].dropna().astype(str))))
+        self.variable_index = {variable: i for i, variable in enumerate(self.variables)}
+        shape = (len(self.countries), len(self.years), len(self.variables))
+
+        # Pivot each series into the dense arrays
+        self.values = {}
+        self.present = {}
+        self.areas = np.full(len(self.countries), np.nan, dtype=object)
+        self.continents = np.full(len(self.countries), np.nan, dtype=object)
+        for series, (category, unit) in self.SERIES.items():
+            rows = generation_data.loc[(generation_data["Category"] == category) & (generation_data["Unit"] == unit)]
+            country_positions = self.country_index.get_indexer(rows["Country code"].astype(str))
+            variable_positions = pd.Index(self.variables).get_indexer(rows["Variable"].astype(str))
+            keep = (country_positions >= 0) & (variable_positions >= 0)
+            rows = rows.loc[keep]
+            country_positions = country_positions[keep]
+            variable_positions = variable_positions[keep]
+            year_positions = rows["Year"].values.astype(int) - self.years[0]
+
+            self.values[series] = np.full(shape, np.nan)
+            self.values[series + "_YoY_Change"] = np.full(shape, np.nan)
+            self.present[series] = np.zeros(shape, dtype=bool)
+            self.values[series][country_positions, year_positions, variable_positions] = rows["Value"].values.astype(float)
+            self.values[series + "_YoY_Change"][country_positions, year_positions, variable_positions] = rows["YoY absolute change"].values.astype(float)
+            self.present[series][country_positions, year_positions, variable_positions] = True
+
+            # Record the area name and continent of each country
+            if series == "Penetration":
+                self.areas[country_positions] = rows["Area"].astype(object).values
+                self.continents[country_positions] = rows["Continent"].astype(object).values
+
+        # Forward-fill penetration
+        self.fill_penetration(max_lookback)
+
+    def fill_penetration(self, max_lookback):
+
+        # Extend the year axis past the data, so that the latest values carry forward
+        self.max_lookback = max_lookback
+        self.filled_years = np.arange(self.years[0], self.years[-1] + max_lookback + 1)
+        penetration = np.full((len(self.countries), len(self.filled_years), len(self.variables)), np.nan)
+        penetration[:, :len(self.years)] = self.values["Penetration"]
+
+        # Fill each missing cell from the nearest earlier year within the lookback
+        filled = penetration.copy()
+        for lookback in range(1, max_lookback + 1):
+            missing = np.isnan(filled[:, lookback:])
+            filled[:, lookback:][missing] = penetration[:, :-lookback][missing]
+        self.imputed = np.isnan(penetration) & ~np.isnan(filled)
+        self.filled = np.nan_to_num(filled, nan=0.0)
+
+    def get(self, series, year, variable):
+
+        # Extract a series for a given year and variable across countries, NaN if not covered
+        year_position = int(year) - self.years[0]
+        if variable not in self.variable_index or not 0 <= year_position < len(self.years):
+            return np.full(len(self.countries), np.nan)
+
+        return self.values[series][:, year_position, self.variable_index[variable]]
+
+    def is_present(self, series, year, variable):
+
+        year_position = int(year) - self.years[0]
+        if variable not in self.variable_index or not 0 <= year_position < len(self.years):
+            return np.zeros(len(self.countries), dtype=bool)
+
+        return self.present[series][:, year_position, self.variable_index[variable]]
+
+    def get_grid(self, series, years, variable):
+
+        # Extract a series for several years and one variable, as a country x year array, NaN where not covered
+        years = np.asarray(years, dtype=int)
+        grid = np.full((len(self.countries), len(years)), np.nan)
+        year_positions = years - self.years[0]
+        covered = (year_positions >= 0) & (year_positions < len(self.years))
+        if variable in self.variable_index:
+            grid[:, covered] = self.values[series][:, year_positions[covered], self.variable_index[variable]]
+
+        return grid
+
+    def latest_grid(self, series, years, variable):
+
+        # Extract a series as a country x year array, holding the latest year of data for later years
+        years = np.asarray(years, dtype=int)
+
+        return self.get_grid(series, np.minimum(years, self.years[-1]), variable)
+
+    def memory_usage(self):
+
+        return sum(array.nbytes for array in self.values.values()) + sum(array.nbytes for array in self.present.values()) + self.filled.nbytes + self.imputed.nbytes
+
+    def compact(self):
+
+        # Store the values as float32
+        self.values = {series: values.astype(np.float32) for series, values in self.values.items()}
+        self.filled = self.filled.astype(np.float32)
+
+        return self
+
+    def filled_positions(self, years):
+
+        # Positions of the years on the filled year axis, with -1 for years outside it
+        year_positions = np.asarray(years, dtype=int) - self.filled_years[0]
+
+        return np.where((year_positions >= 0) & (year_positions < len(self.filled_years)), year_positions, -1)
+
+    def penetration_grid(self, years, variable):
+
+        # Filled penetration for several years, as a country x year array
+        year_positions = self.filled_positions(years)
+        penetration = np.zeros((len(self.countries), len(year_positions)))
+        if variable in self.variable_index:
+            covered = year_positions >= 0
+            penetration[:, covered] = self.filled[:, year_positions[covered], self.variable_index[variable]]
+
+        return penetration
+
+    def country_penetration(self, position, years, variable):
+
+        # Filled penetration of a single country for several years
+        year_positions = self.filled_positions(years)
+        penetration = np.zeros(len(year_positions))
+        if variable in self.variable_index:
+            covered = year_positions >= 0
+            penetration[covered] = self.filled[position, year_positions[covered], self.variable_index[variable]]
+
+        return penetration
+
+    def penetration(self, year, variable):
+
+        # Filled penetration for a given year across countries
+        return self.penetration_grid([year], variable)[:, 0]
+
+    def is_imputed(self, year, variable):
+
+        # Cells whose penetration for a given year was filled from an earlier year
+        year_position = self.filled_positions([year])[0]
+        if variable not in self.variable_index or year_position < 0:
+            return np.zeros(len(self.countries), dtype=bool)
+
+        return self.imputed[:, year_position, self.variable_index[variable]]
+
+
+class GdpRatioMatrix:
+    def __init__(self, inputs, base_year=2024, final_year=2029, lower=0.75, upper=1.25):
+        """ Initialises the GdpRatioMatrix Class, which holds the change in GDP per capita of each country since the base
+        year for every projected year, clipped to limits, so that future CRPs and CDSs can be scaled by a single multiply
+
+        Inputs:
+        Inputs - InputCube holding GDP per capita projections from the IMF's WEO
+        Base_year - year against which the change in GDP per capita is measured
+        Final_year - last year of the IMF projections, used for all later years
+        Lower, Upper - limits on the GDP ratio
+
+        Ratios that cannot be calculated (no IMF data for the country or year) are set to 1. Multipliers (the ratio raised
+        to the elasticity) are cached for each elasticity used, without a growth shock.
+        """
+
+        # Set up the axes, covering each year from the base year to the final year
+        self.countries = inputs.countries
+        self.base_year = base_year
+        self.final_year = final_year
+        self.years = np.arange(base_year, final_year + 1)
+        self.lower = lower
+        self.upper = upper
+
+        # Calculate the ratio against the base year, before and after clipping
+        gdp_years = inputs.coverage["gdp_per_capita"]
+        base_GDP = inputs.get("gdp_per_capita", base_year) if base_year in gdp_years else np.full(len(self.countries), np.nan)
+        self.unclipped = np.full((len(self.countries), len(self.years)), np.nan)
+        for i, year in enumerate(self.years):
+            if year in gdp_years:
+                self.unclipped[:, i] = inputs.get("gdp_per_capita", year) / base_GDP
+        self.ratios = self.clip(self.unclipped)
+        self.multipliers = {}
+
+    def clip(self, ratios):
+
+        # Clip ratios to the limits, setting ratios that cannot be calculated to 1
+        ratios = np.clip(ratios, self.lower, self.upper)
+
+        return np.where(np.isnan(ratios), 1, ratios)
+
+    def year_positions(self, years):
+
+        # Years after the final year use the final year, and years before the base year have no change
+        years = np.clip(np.asarray(years, dtype=int), self.base_year, self.final_year)
+
+        return years - self.base_year
+
+    def ratio(self, years, positions=None):
+
+        # Extract the clipped GDP ratio as a country x year array
+        ratios = self.ratios if positions is None else self.ratios[positions]
+
+        return ratios[:, self.year_positions(years)]
+
+    def multiplier(self, years, elasticity, positions=None, shock=0):
+
+        # Apply a shock to annual growth in GDP per capita (percentage points) before clipping, if given
+        if shock != 0:
+            year_positions = self.year_positions(years)
+            unclipped = self.unclipped if positions is None else self.unclipped[positions]
+            return self.clip(unclipped[:, year_positions] * (1 + shock / 100) ** year_positions) ** elasticity
+
+        # Extract the multiplier on CRPs and CDSs for the given elasticity, as a country x year array
+        if elasticity not in self.multipliers:
+            self.multipliers[elasticity] = self.ratios ** elasticity
+        multipliers = self.multipliers[elasticity] if positions is None else self.multipliers[elasticity][positions]
+
+        return multipliers[:, self.year_positions(years)]
+
+
+class TargetIndex:
+
+    # Ember fuel categories of the targets for Ember variables whose names differ, in order of preference
+    FUEL_CATEGORIES = {"Wind": ["Wind", "Onshore Wind"], "Wind Offshore": ["Offshore Wind"]}
+
+    def __init__(self, ember_targets, countries, metric="share_of_generation_pct", technology_map=None):
+        """ Initialises the TargetIndex Class, which indexes the Ember renewable targets once into country x technology
+        arrays of target values and target years, so that penetration trajectories can be interpolated as arrays
+
+        Inputs:
+        Ember_targets - Targets selected from Ember, in long format
+        Countries - country codes defining the country axis, normally those of the InputCube
+        Metric - target metric to index
+        Technology_map - mapping of technology codes (e.g. solar) onto Ember variables (e.g. Solar), normally the VARIABLE
+        column of the technology premiums. Technologies not in the mapping are looked up by name
+
+        Where a country has several targets for the same technology, the most recently collected target is used. Where a
+        country labels its targets differently (e.g. Onshore Wind rather than Wind), the first category in FUEL_CATEGORIES with
+        a target is used.
+        """
+
+        self.technology_map = {} if technology_map is None else dict(technology_map)
+
+        # Keep the latest target for each country and technology
+        targets = ember_targets.loc[ember_targets["metric"] == metric]
+        targets = targets.sort_values("collection_year", kind="stable").drop_duplicates(subset=["Country code", "fuel_category"], keep="last")
+
+        # Set up the axes
+        self.countries = np.asarray(countries)
+        self.country_index = pd.Index(self.countries)
+        self.technologies = np.array(sorted(set(targets["fuel_category"].dropna().astype(str))))
+        self.technology_index = {technology: i for i, technology in enumerate(self.technologies)}
+
+        # Fill the target values and years
+        self.values = np.full((len(self.countries), len(self.technologies)), np.nan)
+        self.target_years = np.full((len(self.countries), len(self.technologies)), np.nan)
+        country_positions = self.country_index.get_indexer(targets["Country code"].astype(str))
+        technology_positions = pd.Index(self.technologies).get_indexer(targets["fuel_category"].astype(str))
+        keep = (country_positions >= 0) & (technology_positions >= 0)
+        self.values[country_positions[keep], technology_positions[keep]] = targets["value"].values[keep].astype(float)
+        self.target_years[country_positions[keep], technology_positions[keep]] = targets["target_year"].values[keep].astype(float)
+
+    def fuel_categories(self, technology):
+
+        # Ember fuel categories of the targets for a technology code or Ember variable, in order of preference
+        variable = str(self.technology_map.get(technology, technology))
+
+        return self.FUEL_CATEGORIES.get(variable, [variable])
+
+    def get(self, technology, positions=None):
+
+        # Target values and years for a technology across countries, from the first category with a target, NaN where there is none
+        values = np.full(len(self.countries), np.nan)
+        target_years = np.full(len(self.countries), np.nan)
+        for fuel_category in self.fuel_categories(technology):
+            if fuel_category in self.technology_index:
+                missing = np.isnan(values)
+                values[missing] = self.values[missing, self.technology_index[fuel_category]]
+                target_years[missing] = self.target_years[missing, self.technology_index[fuel_category]]
+        if positions is not None:
+            values = values[positions]
+            target_years = target_years[positions]
+
+        return values, target_years
+
+    def trajectory(self, technology, penetration, years, base_year, positions=None, scale=1):
+
+        # Interpolate a country x year array of penetration linearly towards the (scaled) targets, holding the target after the
+        # target year and leaving countries without targets unchanged
+        values, target_years = self.get(technology, positions)
+        values = values * scale
+        years = np.minimum(np.asarray(years, dtype=int)[None, :], target_years[:, None])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            interpolated = penetration + (years - base_year) * (values[:, None] - penetration) / (target_years[:, None] - base_year)
+
+        return np.where(np.isnan(values)[:, None], penetration, interpolated)
+
+
+class RegionIndex:
+    def __init__(self, countries):
+        """ Initialises the RegionIndex Class, which holds groupings of countries (e.g. continents or regions) as group x
+        country membership matrices, built once, so that values across the country axis can be aggregated by group in a
+        single pass
+
+        Inputs:
+        Countries - country codes defining the country axis, normally those of the InputCube
+
+        Groups within a grouping may overlap (e.g. G20 and OECD), in which case a country counts towards each of its groups.
+        """
+
+        self.countries = np.asarray(countries)
+        self.country_index = pd.Index(self.countries)
+        self.groups = {}
+        self.memberships = {}
+
+    def add(self, name, memberships):
+
+        # Read the memberships, either mapping each country code to a group or listing Country code and Group pairs
+        if isinstance(memberships, pd.DataFrame):
+            pairs = memberships[["Country code", "Group"]]
+        else:
+            pairs = pd.Series(memberships).rename_axis("Country code").rename("Group").reset_index()
+        pairs = pairs.dropna()
+        pairs = pairs.loc[self.country_index.get_indexer(pairs["Country code"]) >= 0]
+
+        # Build the group x country membership matrix
+        self.groups[name] = np.array(sorted(set(pairs["Group"].astype(str))), dtype=object)
+        group_positions = pd.Index(self.groups[name]).get_indexer(pairs["Group"].astype(str))
+        self.memberships[name] = np.zeros((len(self.groups[name]), len(self.countries)))
+        self.memberships[name][group_positions, self.country_index.get_indexer(pairs["Country code"])] = 1
+
+    def names(self):
+
+        return list(self.groups)
+
+    def aggregate(self, name, values, weights, percentiles=(10, 50, 90)):
+
+        # Aggregate country x cell arrays by group, ignoring missing values and countries without weight
+        if name not in self.groups:
+            raise KeyError("Unknown grouping: " + str(name) + " (available: " + ", ".join(self.names()) + ")")
+        membership = self.memberships[name]
+        weights = np.where(np.isfinite(values) & np.isfinite(weights), weights, 0)
+        values = np.where(weights > 0, values, np.nan)
+
+        # Weighted mean of each group, from two matrix products over the country axis
+        total = membership @ weights
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (membership @ np.nan_to_num(values * weights)) / total
+        countries = membership @ (weights > 0)
+
+        # Weighted percentiles of each group, from the cumulative weights of the sorted values
+        bands = np.full((len(percentiles), len(membership), values.shape[1]), np.nan)
+        for i, members in enumerate(membership.astype(bool)):
+            if not members.any():
+                continue
+            order = np.argsort(values[members], axis=0)
+            sorted_values = np.take_along_axis(values[members], order, axis=0)
+            cumulative = np.cumsum(np.take_along_axis(weights[members], order, axis=0), axis=0)
+            for j, percentile in enumerate(percentiles):
+                position = np.minimum((cumulative < percentile / 100 * cumulative[-1]).sum(axis=0), members.sum() - 1)
+                bands[j, i] = np.where(cumulative[-1] > 0, np.take_along_axis(sorted_values, position[None], axis=0)[0], np.nan)
+
+        return {"mean": np.where(total > 0, mean, np.nan), "bands": bands, "countries": countries, "total": total}
+
+    def memory_usage(self):
+
+        return sum(membership.nbytes for membership in self.memberships.values())
@@ -0,0 +1,184 @@
+import numpy as np
+
+
+# Output columns of the WACC kernel, in the order they are written
+KERNEL_COLUMNS = ["Risk Free", "Country Risk", "Equity Risk", "Lenders Margin", "Technology Risk", "Equity Cost", "Debt Cost", "WACC", "Debt Share", "Tax Rate"]
+
+# Inputs of the WACC kernel with an analytic partial derivative, in the order they are written
+JACOBIAN_INPUTS = ["rf_rate", "crp", "cds", "erp", "lenders_margin", "technology_premium", "debt_share", "tax_rate"]
+
+# Compiled kernels, built on first use
+KERNELS = {}
+
+
+def wacc_kernel(rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin, out=None, backend="auto"):
+
+    # Broadcast the inputs to a common shape
+    inputs = [np.asarray(value, dtype=float) for value in (rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin)]
+    shape = np.broadcast_shapes(*[value.shape for value in inputs])
+    inputs = [np.broadcast_to(value, shape or (1,)) for value in inputs]
+
+    # Preallocate the output, with one row per output column
+    if out is None:
+        out = np.empty((len(KERNEL_COLUMNS),) + shape)
+    elif out.shape != (len(KERNEL_COLUMNS),) + shape:
+        raise ValueError("Output array has shape " + str(out.shape) + ", expected " + str((len(KERNEL_COLUMNS),) + shape))
+
+    # Evaluate with the selected backend, passing the broadcast views of the inputs without copying them
+    kernel = select_kernel(backend)
+    kernel(*inputs, out.reshape((len(KERNEL_COLUMNS),) + (shape or (1,))))
+
+    return out
+
+
+def wacc_rate(rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin):
+
+    # Evaluate the WACC alone, without the contributions, in three arrays of the broadcast shape
+    shape = np.broadcast_shapes(*[np.shape(value) for value in (rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin)])
+    weight, debt_cost, wacc = np.empty(shape), np.empty(shape), np.empty(shape)
+
+    # Calculate the cost of debt, weighted after tax
+    np.subtract(technology_premium, lenders_margin, out=debt_cost)
+    np.maximum(debt_cost, 0, out=debt_cost)
+    debt_cost += lenders_margin
+    debt_cost += cds
+    debt_cost += rf_rate
+    np.multiply(debt_share, 1 - np.asarray(tax_rate) / 100, out=weight)
+    weight /= 100
+    debt_cost *= weight
+
+    # Calculate the cost of equity, weighted, and add the weighted cost of debt
+    np.add(technology_premium, erp, out=wacc)
+    wacc += crp
+    wacc += rf_rate
+    np.subtract(1, np.asarray(debt_share) / 100, out=weight)
+    wacc *= weight
+    wacc += debt_cost
+
+    return wacc
+
+
+def wacc_jacobian(rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin):
+
+    # Broadcast the inputs to a common shape
+    rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin = np.broadcast_arrays(
+        *[np.asarray(value, dtype=float) for value in (rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin)])
+    out = np.empty((len(JACOBIAN_INPUTS),) + rf_rate.shape)
+    d_rf_rate, d_crp, d_cds, d_erp, d_lenders_margin, d_technology_premium, d_debt_share, d_tax_rate = out
+
+    # Weights of debt (after tax) and equity
+    equity_weight = 1 - debt_share / 100
+    debt_weight = (debt_share / 100) * (1 - tax_rate / 100)
+
+    # Technology premium on debt applies where it exceeds the lenders margin (missing values kept missing)
+    above_margin = np.heaviside(technology_premium - lenders_margin, 0)
+    debt_cost = rf_rate + cds + lenders_margin + np.maximum(technology_premium - lenders_margin, 0)
+    equity_cost = rf_rate + crp + erp + technology_premium
+
+    # Partial derivatives of the WACC with respect to each input, holding the other inputs fixed
+    np.add(debt_weight, equity_weight, out=d_rf_rate)
+    d_crp[...] = equity_weight
+    d_cds[...] = debt_weight
+    d_erp[...] = equity_weight
+    np.multiply(debt_weight, 1 - above_margin, out=d_lenders_margin)
+    np.multiply(debt_weight, above_margin, out=d_technology_premium)
+    d_technology_premium += equity_weight
+    np.subtract(debt_cost * (1 - tax_rate / 100), equity_cost, out=d_debt_share)
+    d_debt_share /= 100
+    np.multiply(debt_cost, -debt_share / 10000, out=d_tax_rate)
+
+    return out
+
+
+def select_kernel(backend="auto"):
+
+    # Use the compiled kernel if requested and available, otherwise NumPy
+    if backend == "numpy":
+        return numpy_kernel
+    if backend not in ["auto", "numba"]:
+        raise ValueError("Unknown kernel backend: " + str(backend))
+    if "numba" not in KERNELS:
+        try:
+            KERNELS["numba"] = build_numba_kernel()
+        except ImportError:
+            if backend == "numba":
+                raise
+            KERNELS["numba"] = None
+    if backend == "numba" and KERNELS["numba"] is None:
+        raise ImportError("The numba kernel backend requires numba")
+
+    return KERNELS["numba"] or numpy_kernel
+
+
+def numpy_kernel(rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin, out):
+
+    risk_free, country_risk, equity_risk, lenders_contribution, technology_risk, equity_cost, debt_cost, wacc, debt_share_out, tax_rate_out = out
+
+    # Weights of debt (after tax) and equity, computed once
+    equity_weight = 1 - debt_share / 100
+    debt_weight = (debt_share / 100) * (1 - tax_rate / 100)
+
+    # Technology premium on debt, held in the technology risk row until the contributions are written
+    np.subtract(technology_premium, lenders_margin, out=technology_risk)
+    np.maximum(technology_risk, 0, out=technology_risk)
+
+    # Calculate the cost of debt and cost of equity
+    np.add(rf_rate, cds, out=debt_cost)
+    debt_cost += lenders_margin
+    debt_cost += technology_risk
+    np.add(rf_rate, crp, out=equity_cost)
+    equity_cost += erp
+    equity_cost += technology_premium
+
+    # Calculate the weighted average cost of capital, using the risk free row as scratch space
+    np.multiply(debt_cost, debt_weight, out=wacc)
+    np.multiply(equity_cost, equity_weight, out=risk_free)
+    wacc += risk_free
+
+    # Extract contributions to the overall WACC
+    np.multiply(technology_risk, debt_weight, out=technology_risk)
+    technology_risk += technology_premium * equity_weight
+    np.multiply(cds, debt_weight, out=country_risk)
+    country_risk += crp * equity_weight
+    np.multiply(erp, equity_weight, out=equity_risk)
+    np.multiply(lenders_margin, debt_weight, out=lenders_contribution)
+    np.multiply(rf_rate, debt_weight + equity_weight, out=risk_free)
+    debt_share_out[...] = debt_share
+    tax_rate_out[...] = tax_rate
+
+
+def build_numba_kernel():
+
+    # Compile an element-wise loop writing every output in a single pass
+    import numba
+
+    @numba.njit(cache=True)
+    def kernel(rf_rate, crp, cds, tax_rate, erp, technology_premium, debt_share, lenders_margin, out):
+
+        # Loop over the broadcast shape, reading broadcast inputs through their strides
+        risk_free, country_risk, equity_risk, lenders_contribution, technology_risk = out[0], out[1], out[2], out[3], out[4]
+        equity_cost_out, debt_cost_out, wacc, debt_share_out, tax_rate_out = out[5], out[6], out[7], out[8], out[9]
+        for i in np.ndindex(rf_rate.shape):
+            equity_weight = 1 - debt_share[i] / 100
+            debt_weight = (debt_share[i] / 100) * (1 - tax_rate[i] / 100)
+
+            # Technology premium on debt, keeping missing values missing
+            technology_premium_debt = technology_premium[i] - lenders_margin[i]
+            if technology_premium_debt < 0:
+                technology_premium_debt = 0.0
+
+            debt_cost = rf_rate[i] + cds[i] + lenders_margin[i] + technology_premium_debt
+            equity_cost = rf_rate[i] + crp[i] + erp[i] + technology_premium[i]
+
+            risk_free[i] = rf_rate[i] * (debt_weight + equity_weight)
+            country_risk[i] = cds[i] * debt_weight + crp[i] * equity_weight
+            equity_risk[i] = erp[i] * equity_weight
+            lenders_contribution[i] = lenders_margin[i] * debt_weight
+            technology_risk[i] = technology_premium_debt * debt_weight + technology_premium[i] * equity_weight
+            equity_cost_out[i] = equity_cost
+            debt_cost_out[i] = debt_cost
+            wacc[i] = debt_cost * debt_weight + equity_cost * equity_weight
+            debt_share_out[i] = debt_share[i]
+            tax_rate_out[i] = tax_rate[i]
+
+    return kernel
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+
+# Cost columns of a cost table, with the value used where a column is not given
+COST_COLUMNS = {"Capex": np.nan, "Fixed Opex": 0.0, "Variable Opex": 0.0, "Capacity Factor": np.nan, "Lifetime": np.nan}
+
+# Keys of the cost table, from the most to the least specific match
+COST_KEYS = [["Technology", "Country code", "Year"], ["Technology", "Country code"], ["Technology", "Year"], ["Technology"]]
+
+
+def capital_recovery_factor(wacc, lifetime):
+
+    # Annuity factor for a WACC (%) over the lifetime, tending to 1 / lifetime as the WACC tends to zero
+    rate = np.asarray(wacc, dtype=float) / 100
+    lifetime = np.asarray(lifetime, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (1 + rate) ** lifetime
+        factor = rate * growth / (growth - 1)
+
+    return np.where(rate == 0, 1 / lifetime, factor)
+
+
+def levelised_cost(wacc, capex, fixed_opex, variable_opex, capacity_factor, lifetime):
+
+    # Levelised cost (USD/MWh) from capex (USD/kW), fixed opex (USD/kW/yr), variable opex (USD/MWh) and capacity factor (fraction)
+    annual_generation = 8.76 * np.asarray(capacity_factor, dtype=float)
+
+    return (capex * capital_recovery_factor(wacc, lifetime) + fixed_opex) / annual_generation + variable_opex
+
+
+class CostTable:
+    def __init__(self, costs):
+        """ Initialises the CostTable Class, which holds cost assumptions by technology, and optionally by country and year,
+        and aligns them with rows of WACC results
+
+        Inputs:
+        Costs - dataframe or CSV path with a Technology column (technology codes), optional Country code and Year columns,
+        and the cost columns Capex (USD/kW), Fixed Opex (USD/kW/yr), Variable Opex (USD/MWh), Capacity Factor (fraction)
+        and Lifetime (years). Fixed and variable opex default to zero where not given
+
+        Where a country or year is missing from a row, the row applies to all countries or years. The most specific row
+        matching each result is used.
+        """
+
+        # Read the costs, adding any missing optional columns
+        costs = pd.read_csv(costs) if isinstance(costs, str) else costs.copy()
+        for column in ["Country code", "Year"]:
+            if column not in costs.columns:
+                costs[column] = np.nan
+        for column, default in COST_COLUMNS.items():
+            if column not in costs.columns:
+                if np.isnan(default):
+                    raise ValueError("Cost table is missing the " + column + " column")
+                costs[column] = default
+            elif not np.isnan(default):
+                costs[column] = costs[column].fillna(default)
+        self.costs = costs.astype({"Year": float})
+
+    def align(self, frame):
+
+        # Keys of each result row, read from the columns or the index of the results
+        keys = frame.index.to_frame(index=False) if "Technology" in frame.index.names else pd.DataFrame(index=range(len(frame)))
+        for key in ["Technology", "Country code", "Year"]:
+            if key not in keys.columns and key in frame.columns:
+                keys[key] = np.asarray(frame[key])
+        keys = keys.astype({key: (float if key == "Year" else object) for key in ["Technology", "Country code", "Year"] if key in keys.columns})
+
+        # Fill the costs of each row from the most specific matching rows of the cost table
+        values = np.full((len(frame), len(COST_COLUMNS)), np.nan)
+        for level in COST_KEYS:
+            if not set(level).issubset(keys.columns):
+                continue
+            other = [key for key in ["Country code", "Year"] if key not in level]
+            rows = self.costs.loc[self.costs[level].notna().all(axis=1) & self.costs[other].isna().all(axis=1), level + list(COST_COLUMNS)]
+            if len(rows) == 0:
+                continue
+            rows = rows.drop_duplicates(subset=level, keep="last").astype({key: (float if key == "Year" else object) for key in level})
+            matched = keys[level].merge(rows, how="left", on=level)[list(COST_COLUMNS)].values
+            fill = np.isnan(values).all(axis=1, keepdims=True)
+            values = np.where(fill, matched, values)
+
+        return dict(zip(COST_COLUMNS, values.T))
+
+
+def wacc_columns(results):
+
+    # Columns holding a WACC, including percentile bands and the WACC of each method
+    return [column for column in results.columns if str(column[-1] if isinstance(column, tuple) else column).startswith("WACC")]
+
+
+def output_column(column, name):
+
+    # Name of the output derived from a WACC column, e.g. WACC P10 to LCOE P10
+    if isinstance(column, tuple):
+        return column[:-1] + (column[-1].replace("WACC", name, 1),)
+
+    return column.replace("WACC", name, 1)
+
+
+def calculate_lcoe(results, costs):
+
+    # Align the costs with the results, which may be the grid, the scenario, method, SSP or uncertainty results
+    costs = costs if isinstance(costs, CostTable) else CostTable(costs)
+    values = costs.align(results)
+
+    # Calculate the capital recovery factor and LCOE for each WACC column in one pass
+    results = results.copy()
+    for column in wacc_columns(results):
+        wacc = np.asarray(results[column], dtype=float)
+        results[output_column(column, "CRF")] = capital_recovery_factor(wacc, values["Lifetime"])
+        results[output_column(column, "LCOE")] = levelised_cost(wacc, values["Capex"], values["Fixed Opex"], values["Variable Opex"],
+                                                               values["Capacity Factor"], values["Lifetime"])
+
+    return results
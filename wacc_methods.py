@@ -0,0 +1,80 @@
+import numpy as np
+from wacc_kernel import KERNEL_COLUMNS
+
+
+def fincore_method(calculator, technologies, rf_rate, crp, cds, tax_rate, erp, penetration, lenders_margin):
+
+    # Calculate WACC and contributions from the FinCoRE technology premium and debt share
+    technology_premium, debt_share = fincore_premium_debt_share(calculator, technologies, crp, penetration)
+
+    return calculator.calculate_wacc_components(rf_rate=rf_rate, crp=crp, cds=cds, tax_rate=tax_rate, erp=erp, technology_premium=technology_premium,
+                                                debt_share=debt_share, lenders_margin=lenders_margin)
+
+
+def fincore_premium_debt_share(calculator, technologies, crp, penetration):
+
+    # Interpolated technology premium, with debt share scaled by CRP relative to the highest CRP across countries (third axis from the end)
+    technology_premium = calculator.technology_premium_grid(technologies, penetration)
+    with np.errstate(invalid="ignore"):
+        debt_share = calculator.calculate_debt_share(crp, max_crp=np.nanmax(crp, axis=-3, keepdims=True))
+
+    return technology_premium, debt_share
+
+
+def irena_method(calculator, technologies, rf_rate, crp, cds, tax_rate, erp, penetration, lenders_margin):
+
+    # Establish the maturity boundaries, which are higher for onshore wind and solar PV
+    names = [calculator.technology_name(technology) for technology in technologies]
+    wind_solar = np.isin(names, ["Onshore Wind", "Solar PV"])
+    mature = np.where(wind_solar, 10, 6)
+    intermediate = np.where(wind_solar, 5, 3)
+
+    # Step-wise technology premium and fixed debt share by maturity, treating missing penetration as 0
+    penetration = np.nan_to_num(penetration, nan=0.0)
+    technology_premium = np.where(penetration > mature, 1.5, np.where(penetration > intermediate, 2.375, 3.25))
+    debt_share = np.where(penetration > mature, 80.0, np.where(penetration > intermediate, 70.0, 60.0))
+
+    # Calculate the cost of debt and cost of equity, with the CRP applied to both
+    debt_weight = (debt_share / 100) * (1 - tax_rate / 100)
+    equity_weight = 1 - debt_share / 100
+    debt_cost = rf_rate + crp + lenders_margin + technology_premium
+    equity_cost = rf_rate + crp + erp + technology_premium
+
+    # Calculate the weighted average cost of capital, adding 1% for offshore wind
+    offshore_adder = np.where(np.isin(names, ["Offshore Wind"]), 1.0, 0.0)
+    estimated_wacc = debt_cost * debt_weight + equity_cost * equity_weight + offshore_adder
+
+    # Extract contributions to the overall WACC
+    shape = np.broadcast_shapes(np.shape(estimated_wacc), np.shape(tax_rate))
+    results = {"Risk Free": rf_rate * (debt_weight + equity_weight), "Country Risk": crp * (debt_weight + equity_weight),
+               "Equity Risk": erp * equity_weight, "Lenders Margin": lenders_margin * debt_weight,
+               "Technology Risk": technology_premium * (debt_weight + equity_weight), "Equity Cost": equity_cost, "Debt Cost": debt_cost,
+               "WACC": estimated_wacc, "Debt Share": debt_share, "Tax Rate": tax_rate}
+
+    return {column: np.broadcast_to(results[column], shape) for column in KERNEL_COLUMNS}
+
+
+class MethodRegistry:
+    def __init__(self):
+        """ Initialises the MethodRegistry Class, which holds the methodologies used to estimate the cost of capital
+
+        Each method is a function taking (calculator, technologies, rf_rate, crp, cds, tax_rate, erp, penetration, lenders_margin),
+        with the inputs as arrays that broadcast over a country x year x technology grid, and returning a dictionary of the
+        WACC and its contributions (KERNEL_COLUMNS). The FinCoRE method and the legacy IRENA method are registered by default.
+        """
+
+        self.methods = {}
+        self.register("fincore", fincore_method)
+        self.register("irena", irena_method)
+
+    def register(self, name, method):
+
+        self.methods[name] = method
+
+    def get(self, name):
+
+        return self.methods[name]
+
+    def names(self):
+
+        return list(self.methods)
@@ -1,19 +1,47 @@
-import xarray as xr
 import pandas as pd
 import numpy as np
-import streamlit as st
 from wacc_calculator_v1 import WaccCalculator
+from data_loader import SnapshotCache, DatasetRegistry, read_ember_generation, compact_frame, EMBER_SERIES
+from wacc_inputs import InputCube, GenerationIndex, GdpRatioMatrix, TargetIndex, RegionIndex
+from wacc_methods import MethodRegistry, fincore_premium_debt_share
+from wacc_scenarios import ScenarioSet
+from wacc_uncertainty import ParameterSampler
+from wacc_ssp import SSPPathways
+from wacc_lcoe import calculate_lcoe
+
+
+def registered_dataset(name):
+
+    # Expose a registry entry as an attribute, loading it on first access
+    return property(lambda self: self.datasets.get(name), lambda self, data: self.datasets.set(name, data))
 
 
 class WaccPredictor:
-    def __init__(self, crp_data, generation_data, GDP, tax_data, ember_targets, us_ir, imf_data, collated_crp_cds, projection_year):
+
+    # Inputs held in the dataset registry
+    crp_data = registered_dataset("crp_data")
+    cds_data = registered_dataset("cds_data")
+    generation_data = registered_dataset("generation_data")
+    gdp_data = registered_dataset("gdp_data")
+    tax_data = registered_dataset("tax_data")
+    imf_data = registered_dataset("imf_data")
+    ember_targets = registered_dataset("ember_targets")
+    renewable_projections = registered_dataset("ember_targets")
+    ir_data = registered_dataset("ir_data")
+    inputs = registered_dataset("inputs")
+    generation = registered_dataset("generation")
+    gdp_ratios = registered_dataset("gdp_ratios")
+    targets = registered_dataset("targets")
+    regions = registered_dataset("regions")
+
+    def __init__(self, crp_data, generation_data, GDP, tax_data, ember_targets, us_ir, imf_data, collated_crp_cds, projection_year, snapshot_dir="./DATA/.snapshots", filter_generation=True, gdp_elasticity=-0.15, max_lookback=1, compact=False):
         """ Initialises the WACC Predictor Class, which is used to generate an estimate of the cost of capital at
          a national level for countries with available data
         
         Inputs:
         Data_path - path direction to Data inputs
         Generation_Data - Ember Yearly Generation Data for 2000-2023
-        CRP_Data - Data on Country Risk Premiums, taken from Damodaran for multiple years.
+        CRP_Data - Data on Country Risk Premiums, taken from Damodaran for multiple years. Superseded by Collated_crp_cds and not read
         Country_codes - Country coding to ISO 3 codes
         GDP - GDP per capita data
         Tax_Data - Corporate Tax Rates for individual countries by year
@@ -22,96 +50,143 @@ class WaccPredictor:
         US_IR - Projections of the U.S. long term interest rates conducted by the CBO alongside OECD IR data
         IMF_data - Projections for GDP per capita from the IMF's WEO
         Collated_crp_cds - Data from Damodaran containing Country Risk Premiums and Ratings-based default spreads
+        Snapshot_dir - Directory for binary snapshots of the parsed inputs, reused while the source files are unchanged (None to disable)
+        Filter_generation - Stream the Ember data in chunks, keeping only the capacity (GW), penetration (%) and generation (TWh) series with categorical identifiers
+        Gdp_elasticity - Elasticity of future CRPs and CDSs to the change in GDP per capita, which can be changed without reloading
+        Max_lookback - Maximum number of years over which missing Ember penetration is filled from the latest earlier year
+        Compact - Store inputs and results compactly (categorical identifiers, float32 values, integer years) to reduce memory
 
         
         """
     
-        # Read in relevant inputs
-        self.crp_data = pd.read_csv(crp_data)
-        self.generation_data = pd.read_csv(generation_data)
-        self.gdp_data = pd.read_csv(GDP)
-        self.tax_data = pd.read_csv(tax_data)
-        self.imf_data = pd.read_csv(imf_data)
-        self.ember_targets = pd.read_csv(ember_targets)
-
-        # Read in crp data
-        self.crp_data = pd.read_excel(collated_crp_cds, sheet_name="CRP", header=0)
-        self.cds_data = pd.read_excel(collated_crp_cds, sheet_name="CDS", header=0)
-        self.crp_data.columns = self.crp_data.columns.astype("str")
-        self.cds_data.columns = self.cds_data.columns.astype("str")
+        # Register inputs, which are each read on first access
+        self.snapshots = SnapshotCache(snapshot_dir)
+        self.datasets = DatasetRegistry(compact=compact)
+        self.compact = compact
+        if filter_generation:
+            self.datasets.register("generation_data", lambda: self.snapshots.load(generation_data, read_ember_generation, series=EMBER_SERIES))
+        else:
+            self.datasets.register("generation_data", lambda: self.snapshots.read_csv(generation_data))
+        self.datasets.register("gdp_data", lambda: self.snapshots.read_csv(GDP))
+        self.datasets.register("tax_data", lambda: self.read_tax_data(tax_data))
+        self.datasets.register("imf_data", lambda: self.snapshots.read_csv(imf_data))
+        self.datasets.register("ember_targets", lambda: self.snapshots.read_csv(ember_targets))
+        self.datasets.register("ir_data", lambda: self.snapshots.read_csv(us_ir))
+
+        # Register crp data, which supersedes the CRP CSV
+        self.datasets.register("crp_data", lambda: self.snapshots.read_excel(collated_crp_cds, sheet_name="CRP", header=0))
+        self.datasets.register("cds_data", lambda: self.snapshots.read_excel(collated_crp_cds, sheet_name="CDS", header=0))
+        self.recent_year = projection_year
 
-        # Fix corporate tax data
-        self.tax_data = self.tax_data.replace(to_replace="NA", value=0)
+        # Register the aligned country x year cube of macroeconomic inputs
+        self.datasets.register("inputs", lambda: InputCube(self.crp_data, self.cds_data, self.tax_data, self.ir_data, self.imf_data))
 
-        # Read in projections of data
-        self.renewable_projections = pd.read_csv(ember_targets)
-        self.ir_data = pd.read_csv(us_ir)
-        self.recent_year = projection_year
+        # Register the Ember data pivoted into country x year x variable arrays
+        self.datasets.register("generation", lambda: GenerationIndex(self.generation_data, self.inputs.countries, max_lookback=max_lookback))
+
+        # Register the clipped change in GDP per capita since 2024, capped at the end of the IMF projections in 2029
+        self.datasets.register("gdp_ratios", lambda: GdpRatioMatrix(self.inputs, base_year=2024, final_year=2029))
+        self.gdp_elasticity = gdp_elasticity
+
+        # Register the share of generation targets, indexed by country and technology
+        self.datasets.register("targets", lambda: TargetIndex(self.ember_targets, self.inputs.countries, technology_map=self.tech_mappings))
+
+        # Register the country groupings used for regional aggregation
+        self.datasets.register("regions", self.build_regions)
 
         # Call WaccCalculator Object
-        self.calculator = WaccCalculator(tech_premiums="./DATA/TechPremiums.csv", penetration_boundaries="./DATA/TechBoundaries.csv", maturity_premiums="./DATA/MaturityPremiums.csv")
+        self.calculator = WaccCalculator(tech_premiums="./DATA/TechPremiums.csv", penetration_boundaries="./DATA/TechBoundaries.csv", maturity_premiums="./DATA/MaturityPremiums.csv", snapshots=self.snapshots)
+
+        # Set up the registry of methodologies evaluated on the grid
+        self.methods = MethodRegistry()
+
+        # Set up the cache of the highest CRP in each year
+        self.max_crps = {}
 
         # Get technologies
         self.technologies = self.calculator.tech_premiums["TECH"].values
         self.tech_mappings = self.calculator.tech_premiums[["TECH", "VARIABLE"]].set_index('TECH')['VARIABLE'].to_dict()
-        
 
-    def calculate_historical_waccs(self, year, technology):
+    def read_tax_data(self, tax_data):
+
+        # Fix corporate tax data
+        tax_data = self.snapshots.read_csv(tax_data)
+        tax_data = tax_data.replace(to_replace="NA", value=0)
+
+        return tax_data
+
+    def build_regions(self):
+
+        # Group countries by Ember continent, and by the Ember regions and groups in the targets
+        regions = RegionIndex(self.inputs.countries)
+        regions.add("continent", dict(zip(self.inputs.countries, self.generation.continents)))
+        countries = self.ember_targets.drop_duplicates(subset="Country code").set_index("Country code")
+        regions.add("ember_region", countries["ember_region"])
+        for flag in ["g20", "oecd", "asean"]:
+            regions.add(flag, countries.loc[countries[flag] == 1, flag].map({1: flag.upper()}))
+
+        return regions
+
+    def memory_report(self):
+
+        # Memory saved by compact mode for each dataset loaded so far
+        return self.datasets.memory_report()
 
-        def fill_missing_RE_values(data, previous_year, year):
+    def compact_results(self, results):
 
-            # Set Country Code as index
-            data.set_index('Country code', inplace=True)
-            previous_year.set_index('Country code', inplace=True)
+        # Store results compactly in compact mode, with categorical identifiers, float32 values and integer years
+        if not self.compact:
+            return results
+        results = results.assign(Year=results["Year"].astype(int))
 
-            # Fill missing values for 2023 with 2022 data
-            data = pd.merge(data, previous_year, on="Country code", how="left")
-            data['Penetration_' + str(year)] = data['Penetration_' + str(year)].fillna(data['Penetration_'+str(year-1)])
+        return compact_frame(results, max_category_ratio=1)
 
-            # Reset index if needed
-            data.reset_index(inplace=True)
+    def input_frame(self, variable, year, column):
 
-            return data
+        # Extract an input for a given year across all countries
+        inputs = self.inputs
+        return pd.DataFrame({"Country code": inputs.countries, column: inputs.get(variable, year)}, index=inputs.row_labels)
+
+    def penetration_frame(self, year, ember_name):
+
+        # Extract penetration for a given year across all countries, filled from the previous year
+        inputs = self.inputs
+        return pd.DataFrame({"Country code": inputs.countries, "Penetration": self.generation.penetration(year, ember_name)}, index=inputs.row_labels)
+
+    def input_series(self, variable, year, positions):
+
+        # Extract an input for a given year at the selected country positions
+        inputs = self.inputs
+        return pd.Series(inputs.get(variable, year, positions), index=inputs.row_labels[positions])
         
+
+    def calculate_historical_waccs(self, year, technology):
+
         # Convert year into a string
         year_str = str(year)
         year_int = int(year)
 
         # Extract long term U.S. interest rates (proxy for risk free rate)
-        rf_rate = self.ir_data[self.ir_data['Country code'] == "USA"][year_str].values[0].astype(float)
+        rf_rate = self.inputs.year_value("rf_rate", year_str)
 
         # Extract CRPs
-        crps = self.pull_CRP_data(year_str)
-        cds = self.pull_CDS_data(year_str)
-        erp = crps[crps['Country code']=="ERP"]["CRP_"+year_str][0]
-        crp_data = crps
-        cds_data = cds
+        crp_data = self.input_frame("crp", year_str, "CRP_"+year_str)
+        cds_data = self.input_frame("cds", year_str, "CDS_"+year_str)
+        erp = self.inputs.year_value("erp", year_str)
 
         # Extract Generation Data
-        if year == str(self.recent_year):
+        if int(year) == self.recent_year:
             year_str = "2024"
             year_int = 2024
-        variable = str(self.tech_mappings.get(technology))
-        if variable == "Other":
-            ember_name = "Solar"
-        else:
-            ember_name = variable
-        generation_data = self.pull_generation_data_v2(year_str, ember_name)
-        previous_year = self.pull_generation_data_v2(str(year_int-1), ember_name)
-        generation_data = fill_missing_RE_values(generation_data, previous_year, year_int)
-        generation_data = pd.merge(self.crp_data['Country code'],generation_data[['Country code', 'Penetration_'+year_str]], on="Country code", how="left")
-        generation_data.fillna(0, inplace=True)
-        generation_data.rename(columns={"Penetration_"+year_str:"Penetration"}, inplace=True)
+        ember_name = self.ember_name(technology)
+        generation_data = self.penetration_frame(year_int, ember_name)
         if technology == "Other":
             generation_data["Penetration"] = generation_data["Penetration"] * 0
 
 
         # Extract Tax Rates
-        tax_rate = pd.merge(self.crp_data['Country code'], self.tax_data[['Country code', year_str]], on="Country code", how="left")
-        tax_rate["Tax Rate"] = tax_rate[year_str]
-        tax_rate['Tax Rate'] = tax_rate['Tax Rate'].fillna(value=0)
-        tax_data = tax_rate
-        if year == str(self.recent_year):
+        tax_data = self.input_frame("tax_rate", year_str, "Tax Rate")
+        if int(year) == self.recent_year:
             year_str = str(year)
                            
 
@@ -122,67 +197,43 @@ class WaccPredictor:
         # Clean results
         results = results.dropna(thresh=11)
 
-        return results
-
-
-    def calculate_all_future_waccs(self, year, technology):
-
-        def fill_missing_RE_values(data, previous_year, year):
-
-            # Set Country Code as index
-            data.set_index('Country code', inplace=True)
-            previous_year.set_index('Country code', inplace=True)
+        return self.compact_results(results)
 
-            # Fill missing values for 2023 with 2022 data
-            data = pd.merge(data, previous_year, on="Country code", how="left")
-            data['Penetration_' + str(year)] = data['Penetration_' + str(year)].fillna(data['Penetration_'+str(year-1)])
 
-            # Reset index if needed
-            data.reset_index(inplace=True)
+    def calculate_all_future_waccs(self, year, technology, renewable_targets=None):
 
-            return data
-        
         # Convert year into a string
         year_str = str(year)
         year_int = int(year)
         year_old = str(self.recent_year)
 
         # Extract long term U.S. interest rates (proxy for risk free rate)
-        rf_rate = self.ir_data[self.ir_data['Country code'] == "USA"][year_str].values[0].astype(float)
+        rf_rate = self.inputs.year_value("rf_rate", year_str)
 
         # Extract CRPs
-        old_crp = self.pull_CRP_data(year_old)
-        old_cds = self.pull_CDS_data(year_old)
-        crps = self.calculate_future_crp_all(year_str=year_str, year_old=year_old, crp=old_crp)
-        cds = self.calculate_future_cds_all(year_str=year_str, year_old=year_old, cds=old_cds)
+        old_crp = self.input_frame("crp", year_old, "CRP_"+year_old)
+        old_cds = self.input_frame("cds", year_old, "CDS_"+year_old)
+        crp_data = self.calculate_future_crp_all(year_str=year_str, year_old=year_old, crp=old_crp)
+        cds_data = self.calculate_future_cds_all(year_str=year_str, year_old=year_old, cds=old_cds)
 
         # Set into normal format
-        erp = old_crp[old_crp['Country code']=="ERP"]["CRP_"+year_old][0].astype(float)
-        crp_data = crps
-        cds_data = cds
+        erp = self.inputs.year_value("erp", year_old)
 
 
         # Extract Generation Data
-        variable = str(self.tech_mappings.get(technology))
-        if variable == "Other":
-            ember_name = "Solar"
-        else:
-            ember_name = variable
-        generation_data = self.pull_generation_data_v2(year_str, ember_name)
-        previous_year = self.pull_generation_data_v2(str(year_int-1), ember_name)
-        generation_data = fill_missing_RE_values(generation_data, previous_year, year_int)
-        generation_data = pd.merge(self.crp_data['Country code'],generation_data[['Country code', 'Penetration_'+year_str]], on="Country code", how="left")
-        generation_data.fillna(0, inplace=True)
-        generation_data.rename(columns={"Penetration_"+year_str:"Penetration"}, inplace=True)
+        ember_name = self.ember_name(technology)
+        generation_data = self.penetration_frame(year_int, ember_name)
         if technology == "Other":
             generation_data["Penetration"] = generation_data["Penetration"] * 0
 
+        # Interpolate towards renewable targets, if selected
+        if renewable_targets is not None:
+            penetration = generation_data["Penetration"].values[:, None]
+            generation_data["Penetration"] = self.targets.trajectory(technology, penetration, [year_int], self.recent_year)[:, 0]
+
 
         # Extract Tax Rates
-        tax_rate = pd.merge(self.crp_data['Country code'], self.tax_data[['Country code', year_old]], on="Country code", how="left")
-        tax_rate["Tax Rate"] = tax_rate[year_old]
-        tax_rate['Tax Rate'] = tax_rate['Tax Rate'].fillna(value=0)
-        tax_data = tax_rate
+        tax_data = self.input_frame("tax_rate", year_old, "Tax Rate")
                            
 
         # Calculate WACC and contributions
@@ -192,8 +243,432 @@ class WaccPredictor:
         # Clean results
         results = results.dropna(thresh=11)
 
+        return self.compact_results(results)
+
+    def calculate_wacc_grid(self, years, technologies, renewable_targets=None):
+
+        # Calculate WACC and contributions across the grid with the FinCoRE method
+        technologies = list(technologies)
+        grid = self.grid_inputs(years, technologies, renewable_targets=renewable_targets)
+        results = self.methods.get("fincore")(self.calculator, **grid)
+        results = self.flatten_grid(years, technologies, results)
+
+        # Clean results, allowing a single missing contribution as for the individual calculations
+        results = results.dropna(thresh=len(results.columns) - 1).reset_index(drop=True)
+
+        return self.compact_results(results)
+
+    def calculate_lcoe_grid(self, years, technologies, costs, renewable_targets=None):
+
+        # Calculate the capital recovery factor and LCOE alongside the WACC across the grid
+        return calculate_lcoe(self.calculate_wacc_grid(years, technologies, renewable_targets=renewable_targets), costs)
+
+    def calculate_regional_waccs(self, years, technologies, grouping="continent", weights="capacity", percentiles=(10, 50, 90), renewable_targets=None):
+
+        # Calculate WACC across the grid with the FinCoRE method
+        years = np.asarray(years, dtype=int)
+        technologies = list(technologies)
+        grid = self.grid_inputs(years, technologies, renewable_targets=renewable_targets)
+        wacc = self.methods.get("fincore")(self.calculator, **grid)["WACC"]
+        shape = wacc.shape
+
+        # Weight each country by the capacity or generation of the technology's Ember variable, holding the latest data for later years
+        if isinstance(weights, str) and weights in ["capacity", "generation"]:
+            series = weights.capitalize()
+            weight_grid = np.zeros(shape)
+            for i, technology in enumerate(technologies):
+                if technology != "Other":
+                    weight_grid[:, :, i] = self.generation.latest_grid(series, years, self.ember_name(technology))
+        elif isinstance(weights, str) and weights == "equal":
+            weight_grid = np.ones(shape)
+        else:
+            weight_grid = np.broadcast_to(weights, shape)
+
+        # Use a registered grouping, or index an ad-hoc grouping locally so that the shared index is never modified
+        if isinstance(grouping, str):
+            name, regions = grouping, self.regions
+        else:
+            name, regions = "custom", RegionIndex(self.inputs.countries)
+            regions.add(name, grouping)
+
+        # Aggregate every year and technology by group in a single pass over the group index
+        aggregated = regions.aggregate(name, wacc.reshape(shape[0], -1), weight_grid.reshape(shape[0], -1), percentiles=percentiles)
+
+        # Tabulate by year, technology and group
+        groups = regions.groups[name]
+        cells = len(years) * len(technologies)
+        results = pd.DataFrame({"Group": np.tile(groups, cells),
+                                "Year": np.repeat(years, len(technologies) * len(groups)),
+                                "Technology": np.tile(np.repeat(np.array(technologies, dtype=object), len(groups)), len(years))})
+        results["WACC"] = aggregated["mean"].T.ravel()
+        for percentile, band in zip(percentiles, aggregated["bands"]):
+            results["WACC P" + str(percentile)] = band.T.ravel()
+        results["Countries"] = aggregated["countries"].T.ravel().astype(int)
+        results["Weight"] = aggregated["total"].T.ravel()
+        results = results.loc[results["Countries"] > 0].reset_index(drop=True)
+
+        return self.compact_results(results)
+
+    def calculate_method_grid(self, years, technologies, methods=None, renewable_targets=None):
+
+        # Evaluate each registered method on the same inputs, reading the inputs once
+        methods = self.methods.names() if methods is None else list(methods)
+        technologies = list(technologies)
+        grid = self.grid_inputs(years, technologies, renewable_targets=renewable_targets)
+        frames = {}
+        for method in methods:
+            results = self.methods.get(method)(self.calculator, **grid)
+            frames[method] = self.flatten_grid(years, technologies, results).set_index(["Country code", "Year", "Technology"])
+
+        # Place the methods side by side, keeping cells where any method has an estimate
+        results = pd.concat(frames, axis=1, names=["Method", "Output"])
+        wacc = results.loc[:, (slice(None), "WACC")]
+        results = results.loc[wacc.notna().any(axis=1)]
+
+        return self.compact_results(results)
+
+    def ssp_pathways(self, gdp_pathways, years=range(2025, 2101), penetration_pathways=None, rf_pathways=None):
+
+        # Interpolate SSP pathways onto the countries of the input cube
+        return SSPPathways(gdp_pathways, self.inputs.countries, years, penetration_pathways=penetration_pathways, rf_pathways=rf_pathways)
+
+    def calculate_ssp_projections(self, pathways, technologies, output_path=None, method="fincore", chunk_size=1, lower=0.75, upper=1.25):
+
+        # Hold CRPs, CDSs, tax rates and the ERP at their most recent values, as in the future path
+        inputs = self.inputs
+        years = pathways.years
+        technologies = list(technologies)
+        crp = inputs.get("crp", self.recent_year)[None, :, None, None]
+        cds = inputs.get("cds", self.recent_year)[None, :, None, None]
+        tax_rate = inputs.get("tax_rate", self.recent_year)[None, :, None, None]
+        erp = inputs.year_value("erp", self.recent_year)
+
+        # Take the risk free rate from the pathways, or from the projections held at their final year
+        if pathways.rf_rate is not None:
+            rf_rate = pathways.rf_rate
+        else:
+            rf_years = sorted(inputs.coverage["rf_rate"])
+            rf_rate = np.tile(inputs.year_values("rf_rate", np.clip(years, rf_years[0], rf_years[-1])), (len(pathways.ssps), 1))
+
+        # Scale future CRPs and CDSs by the change in GDP per capita along each pathway
+        scaling = np.ones((len(pathways.ssps), len(inputs.countries), len(years)))
+        future = years > self.recent_year
+        scaling[:, :, future] = pathways.gdp_ratio(self.gdp_ratios.base_year, lower=lower, upper=upper)[:, :, future] ** self.gdp_elasticity
+
+        # Take penetration from the pathways, falling back to the most recent year's penetration where a pathway is missing
+        penetration = np.zeros((len(pathways.ssps), len(inputs.countries), len(years), len(technologies)))
+        for i, technology in enumerate(technologies):
+            if technology == "Other":
+                continue
+            ember_name = self.ember_name(technology)
+            recent = self.generation.penetration_grid([self.recent_year], ember_name)
+            projected = pathways.penetration.get(ember_name, np.full(penetration.shape[:3], np.nan))
+            penetration[:, :, :, i] = np.where(np.isnan(projected), recent[None], projected)
+
+        # Evaluate the pathways in chunks, writing each chunk to disk if an output path is given
+        frames = []
+        for start in range(0, len(pathways.ssps), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            results = self.methods.get(method)(self.calculator, technologies=technologies, rf_rate=rf_rate[chunk, None, :, None], crp=crp * scaling[chunk, :, :, None],
+                                               cds=cds * scaling[chunk, :, :, None], tax_rate=tax_rate, erp=erp, penetration=penetration[chunk],
+                                               lenders_margin=self.calculator.lenders_margin)
+            for i, ssp in enumerate(pathways.ssps[chunk]):
+                frame = self.flatten_grid(years, technologies, {column: values[i] for column, values in results.items()})
+                frame = frame.dropna(thresh=len(frame.columns) - 1)
+                frame.insert(0, "SSP", ssp)
+                if output_path is None:
+                    frames.append(frame)
+                else:
+                    frame.to_csv(output_path, mode="w" if start == 0 and i == 0 else "a", header=start == 0 and i == 0, index=False)
+
+        # Return the results, or the path they were written to
+        if output_path is not None:
+            return output_path
+        results = pd.concat(frames, ignore_index=True)
+
+        return self.compact_results(results)
+
+    def calculate_sensitivity_grid(self, years, technologies, renewable_targets=None):
+
+        # Calculate the FinCoRE technology premium and debt share across the grid
+        technologies = list(technologies)
+        grid = self.grid_inputs(years, technologies, renewable_targets=renewable_targets)
+        technology_premium, debt_share = fincore_premium_debt_share(self.calculator, technologies, grid["crp"], grid["penetration"])
+        inputs = {"rf_rate": grid["rf_rate"], "crp": grid["crp"], "cds": grid["cds"], "tax_rate": grid["tax_rate"], "erp": grid["erp"],
+                  "technology_premium": technology_premium, "debt_share": debt_share, "lenders_margin": grid["lenders_margin"]}
+
+        # Calculate WACC and contributions alongside the partial derivatives of the WACC with respect to each input
+        results = self.flatten_grid(years, technologies, self.calculator.calculate_wacc_components(**inputs))
+        jacobian = self.calculator.calculate_wacc_jacobian(**inputs)
+        keep = results.notna().sum(axis=1) >= len(results.columns) - 1
+        for name, values in jacobian.items():
+            results["dWACC/d" + name] = self.grid_cells(values, years, technologies)
+
+        # Clean results, allowing a single missing contribution as for the grid
+        results = results.loc[keep].reset_index(drop=True)
+
+        return self.compact_results(results)
+
+    def calculate_scenario_grid(self, scenarios, years, technologies, method="fincore", chunk_size=10):
+
+        # Set up the scenarios and the inputs shared between them, without GDP scaling or renewable targets
+        scenarios = scenarios if isinstance(scenarios, ScenarioSet) else ScenarioSet(scenarios)
+        years = np.asarray(years, dtype=int)
+        technologies = list(technologies)
+        grid = self.grid_inputs(years, technologies, GDP_change=False)
+        future = years > self.recent_year
+
+        # Expand the settings of each scenario into arrays with a leading scenario axis
+        projected_rf = grid["rf_rate"][0, :, 0]
+        recent_rf = np.where(future, self.inputs.year_value("rf_rate", self.recent_year), projected_rf)
+        rf_rate = scenarios.rf_rates(years, projected_rf, recent_rf)
+        erp = scenarios.erps(grid["erp"][0, :, 0])
+        lenders_margin = scenarios.lenders_margins(self.calculator.lenders_margin)
+        gdp_scaling = {shock: self.gdp_scaling(years, shock=shock) for shock in set(scenarios.gdp_shocks()) if shock is not None}
+        gdp_scaling[None] = np.ones((len(self.inputs.countries), len(years)))
+        penetration = {scale: self.target_penetration(grid["penetration"], years, technologies, scale=scale)
+                       for scale in set(scenarios.target_scales()) if scale is not None}
+        penetration[None] = grid["penetration"]
+
+        # Evaluate the scenarios in chunks, bounding the size of the arrays held at once
+        frames = []
+        for start in range(0, len(scenarios), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            scaling = np.stack([gdp_scaling[shock] for shock in scenarios.gdp_shocks()[chunk]])[:, :, :, None]
+            results = self.methods.get(method)(self.calculator, technologies=technologies, rf_rate=rf_rate[chunk, None, :, None],
+                                               crp=grid["crp"][None] * scaling, cds=grid["cds"][None] * scaling, tax_rate=grid["tax_rate"][None],
+                                               erp=erp[chunk, None, :, None], penetration=np.stack([penetration[scale] for scale in scenarios.target_scales()[chunk]]),
+                                               lenders_margin=lenders_margin[chunk, None, None, None])
+
+            # Flatten each scenario, allowing a single missing contribution as for the grid
+            for i, name in enumerate(scenarios.names[chunk]):
+                frame = self.flatten_grid(years, technologies, {column: values[i] for column, values in results.items()})
+                frame = frame.dropna(thresh=len(frame.columns) - 1)
+                frame.insert(0, "Scenario", name)
+                frames.append(frame)
+        results = pd.concat(frames, ignore_index=True)
+
+        return self.compact_results(results)
+
+    def calculate_wacc_uncertainty(self, years, technologies, distributions, draws=10000, seed=None, percentiles=(10, 50, 90), max_elements=1000000, renewable_targets=None):
+
+        # Draw the uncertain parameters up front, so that the draws do not depend on the chunk size
+        defaults = {"erp_shift": 0, "gdp_elasticity": self.gdp_elasticity, "lenders_margin": self.calculator.lenders_margin,
+                    "boundary_scale": 1, "mature_premium_scale": 1, "immature_premium_scale": 1}
+        samples = ParameterSampler(distributions, defaults, seed=seed).sample(draws)
+        samples = {parameter: values[None, :] for parameter, values in samples.items()}
+        elasticity = samples["gdp_elasticity"]
+
+        # Extract the grid inputs, with the change in GDP per capita held separately as it depends on the elasticity
+        years = np.asarray(years, dtype=int)
+        technologies = list(technologies)
+        grid = self.grid_inputs(years, technologies, renewable_targets=renewable_targets, GDP_change=False)
+        future = years > self.recent_year
+        gdp_ratio = np.ones((len(self.inputs.countries), len(years)))
+        gdp_ratio[:, future] = self.gdp_ratios.ratio(years[future])
+
+        # Calculate the highest CRP across countries in each year, for each draw
+        max_crp = np.empty((len(years), draws))
+        for i in range(len(years)):
+            max_crp[i] = np.nanmax(grid["crp"][:, i, :] * gdp_ratio[:, i, None] ** elasticity, axis=0)
+
+        # Flatten the inputs, keeping cells with a complete set of inputs
+        cells = {name: self.grid_cells(grid[name], years, technologies) for name in ["rf_rate", "crp", "cds", "tax_rate", "erp", "penetration"]}
+        cells["gdp_ratio"] = self.grid_cells(gdp_ratio[:, :, None], years, technologies)
+        cells["year"] = self.grid_cells(np.arange(len(years))[None, :, None], years, technologies)
+        cells["technology"] = self.grid_cells(np.arange(len(technologies)), years, technologies)
+        valid = np.flatnonzero(np.isfinite(np.column_stack([cells[name] for name in ["rf_rate", "crp", "cds", "tax_rate", "erp"]])).all(axis=1))
+        parameters = self.calculator.technology_parameter_grid(technologies)
+
+        # Evaluate all draws for chunks of cells (cell x draw arrays), bounding the number of values held at once
+        chunk_size = max(1, max_elements // draws)
+        bands = np.empty((len(valid), len(percentiles)))
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            cell = {name: values[chunk][:, None] for name, values in cells.items()}
+            scaling = cell["gdp_ratio"] ** elasticity
+            crp = cell["crp"] * scaling
+            debt_share = self.calculator.calculate_debt_share(crp, max_crp=max_crp[cells["year"][chunk]])
+            intermediate, mature, maturity_premium, immature_premium, relative_premium = parameters[:, cells["technology"][chunk], None]
+            technology_premium = self.calculator.interpolate_premium(cell["penetration"], intermediate * samples["boundary_scale"], mature * samples["boundary_scale"],
+                                                                     maturity_premium * samples["mature_premium_scale"],
+                                                                     immature_premium * samples["immature_premium_scale"]) + relative_premium
+            wacc = self.calculator.calculate_wacc_rate(rf_rate=cell["rf_rate"], crp=crp, cds=cell["cds"] * scaling, tax_rate=cell["tax_rate"],
+                                                       erp=cell["erp"] + samples["erp_shift"], technology_premium=technology_premium,
+                                                       debt_share=debt_share, lenders_margin=samples["lenders_margin"])
+            bands[start:start + len(chunk)] = np.percentile(wacc, percentiles, axis=1).T
+
+        # Tabulate the percentile bands of the WACC for each cell
+        labels = self.grid_labels(years, technologies)
+        results = pd.DataFrame({name: values[valid] for name, values in labels.items()})
+        for percentile, band in zip(percentiles, bands.T):
+            results["WACC P" + str(percentile)] = band
+
+        return self.compact_results(results)
+
+    def grid_inputs(self, years, technologies, renewable_targets=None, GDP_change=True):
+
+        # Set up the grid axes, with future years taking their inputs from the most recent year, and the generation and tax
+        # data of the most recent year taken from 2024 as in calculate_historical_waccs
+        inputs = self.inputs
+        years = np.asarray(years, dtype=int)
+        technologies = list(technologies)
+        input_years = np.where(years > self.recent_year, self.recent_year, years)
+        data_years = np.where(years == self.recent_year, 2024, years)
+
+        # Extract inputs as country x year arrays, scaling future CRPs and CDSs by the change in GDP per capita
+        rf_rate = np.array([inputs.year_value("rf_rate", year) for year in years])
+        erp = np.array([inputs.year_value("erp", year) for year in input_years])
+        crp = np.column_stack([inputs.get("crp", year) for year in input_years])
+        cds = np.column_stack([inputs.get("cds", year) for year in input_years])
+        if GDP_change:
+            gdp_scaling = self.gdp_scaling(years)
+            crp = crp * gdp_scaling
+            cds = cds * gdp_scaling
+        tax_years = np.where(years > self.recent_year, self.recent_year, data_years)
+        tax_rate = np.column_stack([inputs.get("tax_rate", year) for year in tax_years])
+
+        # Extract penetration for each technology, reading each Ember variable once
+        penetration = np.zeros((len(inputs.countries), len(years), len(technologies)))
+        ember_penetration = {}
+        for i, technology in enumerate(technologies):
+            if technology == "Other":
+                continue
+            ember_name = self.ember_name(technology)
+            if ember_name not in ember_penetration:
+                ember_penetration[ember_name] = self.generation.penetration_grid(data_years, ember_name)
+            penetration[:, :, i] = ember_penetration[ember_name]
+
+        # Interpolate projected penetration towards renewable targets, if selected
+        if renewable_targets is not None:
+            penetration = self.target_penetration(penetration, years, technologies)
+
+        # Return inputs broadcastable over a country x year x technology grid
+        grid = {"technologies": technologies, "rf_rate": rf_rate[None, :, None], "crp": crp[:, :, None], "cds": cds[:, :, None],
+                "tax_rate": tax_rate[:, :, None], "erp": erp[None, :, None], "penetration": penetration,
+                "lenders_margin": self.calculator.lenders_margin}
+
+        return grid
+
+    def target_penetration(self, penetration, years, technologies, scale=1):
+
+        # Interpolate projected penetration (country x year x technology) towards the scaled renewable targets
+        future = years > self.recent_year
+        penetration = penetration.copy()
+        if future.any():
+            for i, technology in enumerate(technologies):
+                penetration[:, future, i] = self.targets.trajectory(technology, penetration[:, future, i], years[future], self.recent_year, scale=scale)
+
+        return penetration
+
+    def flatten_grid(self, years, technologies, results):
+
+        # Flatten grid results into a long table ordered by year, technology and country
+        labels = self.grid_labels(years, technologies)
+        columns = {"Country code": labels["Country code"]}
+        for column in self.calculator.RESULT_COLUMNS:
+            columns[column] = self.grid_cells(results[column], years, technologies)
+        columns["Year"] = labels["Year"]
+        columns["Technology"] = labels["Technology"]
+
+        return pd.DataFrame(columns)
+
+    def grid_cells(self, values, years, technologies):
+
+        # Flatten an array broadcastable over the country x year x technology grid, ordered by year, technology and country
+        shape = (len(self.inputs.countries), len(years), len(technologies))
+
+        return np.broadcast_to(values, shape).transpose(1, 2, 0).ravel()
+
+    def grid_labels(self, years, technologies):
+
+        # Country, year and technology of each cell of the flattened grid
+        countries = self.inputs.countries
+        years = np.asarray(years, dtype=int)
+        labels = {"Country code": np.tile(countries, len(years) * len(technologies)),
+                  "Year": np.repeat(years, len(technologies) * len(countries)),
+                  "Technology": np.tile(np.repeat(np.array(technologies, dtype=object), len(countries)), len(years))}
+
+        return labels
+
+    def calculate_point_wacc(self, country_code, year, technology):
+
+        # Calculate the WACC breakdown for a single cell, as a one-row dataframe (empty if the cell has no estimate)
+        results = self.point_wacc(country_code, year, technology)
+        if results is None:
+            return pd.DataFrame(columns=["Country code"] + self.calculator.RESULT_COLUMNS + ["Year"])
+        results = pd.DataFrame(data={"Country code": country_code, **results, "Year": int(year)}, index=self.inputs.row_labels[self.inputs.locate(country_code)[:1]])
+
+        return results
+
+    def point_wacc(self, country_code, year, technology):
+
+        # Locate the cell, taking generation and tax data for the projection year from 2024 as in calculate_historical_waccs
+        inputs = self.inputs
+        year_int = int(year)
+        year_old = self.recent_year
+        future = year_int > self.recent_year
+        positions = inputs.locate(country_code)
+        if len(positions) == 0:
+            return None
+        position = positions[0]
+        data_year = 2024 if year_int == self.recent_year else year_int
+
+        # Extract the cell's inputs, with projections scaled by the change in GDP per capita
+        rf_rate = inputs.year_value("rf_rate", year_int)
+        if future:
+            erp = inputs.year_value("erp", year_old)
+            gdp_scaling = self.gdp_ratios.multiplier([year_int], self.gdp_elasticity, [position])[0, 0]
+            crp_data = inputs.get("crp", year_old, [position])[0] * gdp_scaling
+            cds_data = inputs.get("cds", year_old, [position])[0] * gdp_scaling
+            tax_data = inputs.get("tax_rate", year_old, [position])[0]
+        else:
+            erp = inputs.year_value("erp", year_int)
+            crp_data = inputs.get("crp", year_int, [position])[0]
+            cds_data = inputs.get("cds", year_int, [position])[0]
+            tax_data = inputs.get("tax_rate", data_year, [position])[0]
+
+        # Extract Generation Data
+        penetration = self.generation.country_penetration(position, [data_year], self.ember_name(technology))
+        if technology == "Other":
+            penetration = penetration * 0
+
+        # Calculate WACC and contributions, with debt share relative to the highest CRP across countries in that year
+        technology_premium = self.calculator.technology_premium_grid([technology], penetration)
+        debt_share = self.calculator.calculate_debt_share(crp_data, max_crp=self.max_crp(year_int))
+        results = self.calculator.calculate_wacc_components(rf_rate=rf_rate, crp=crp_data, cds=cds_data, tax_rate=tax_data, erp=erp,
+                                                            technology_premium=technology_premium, debt_share=debt_share)
+
+        # Drop the cell if more than one contribution is missing, as in calculate_historical_waccs
+        results = {column: float(value[0]) for column, value in results.items()}
+        if np.isnan(list(results.values())).sum() > 1:
+            return None
+
         return results
 
+    def max_crp(self, year):
+
+        # Highest CRP across countries in a given year, cached on first use
+        key = (year, self.gdp_elasticity)
+        if key not in self.max_crps:
+            if year > self.recent_year:
+                crp = self.inputs.get("crp", self.recent_year) * self.gdp_scaling([year])[:, 0]
+            else:
+                crp = self.inputs.get("crp", year)
+            self.max_crps[key] = np.nanmax(crp)
+
+        return self.max_crps[key]
+
+    def gdp_scaling(self, years, shock=0):
+
+        # Scale factor on CRPs and CDSs from the change in GDP per capita, for projected years only
+        years = np.asarray(years, dtype=int)
+        future = years > self.recent_year
+        scaling = np.ones((len(self.inputs.countries), len(years)))
+        scaling[:, future] = self.gdp_ratios.multiplier(years[future], self.gdp_elasticity, shock=shock)
+
+        return scaling
+
     def pull_CRP_data(self, year):
 
         
@@ -223,144 +698,186 @@ class WaccPredictor:
 
     def pull_generation_data_v2(self, year_str, technology):
 
-        
-        # Extract generation data
-        generation_data = self.generation_data
-        if year_str == str(self.recent_year):
-            year = "2023"
-        year = int(year_str)
-        
-        # Extract Capacity
-        capacity_subset = generation_data[(generation_data['Year'] == year) & (generation_data['Category'] == "Capacity") & (generation_data['Unit'] == "GW")]                                             
-        capacity_data = capacity_subset[capacity_subset['Variable'] == technology]
-        capacity_data = capacity_data.rename(columns = {"Value" : "Capacity_" + year_str, "YoY absolute change": "Capacity_" + year_str + "_YoY_Change"})
-
-        
-        # Extract Penetration
-        penetration_subset = generation_data[(generation_data['Year'] == year) & (generation_data['Category'] ==  "Electricity generation") & (generation_data['Unit'] == "%")]  
-        penetration_data = penetration_subset[penetration_subset['Variable'] == technology]
-        penetration_data = penetration_data.rename(columns = {"Value" : "Penetration_" + year_str, "YoY absolute change": "Penetration_" + year_str + "_YoY_Change"})
+        # Locate each country of the CRP dataset in the generation index
+        generation = self.generation
+        country_codes = self.crp_data['Country code']
+        positions = generation.country_index.get_indexer(country_codes)
+        found = positions >= 0
+
+        def extract(series):
+            values = np.full(len(country_codes), np.nan)
+            values[found] = generation.get(series, year_str, technology)[positions[found]]
+            return values
+
+        # Identify countries with penetration data, which carry the area details
+        has_penetration = np.zeros(len(country_codes), dtype=bool)
+        has_penetration[found] = generation.is_present("Penetration", year_str, technology)[positions[found]]
+        areas = np.full(len(country_codes), np.nan, dtype=object)
+        continents = np.full(len(country_codes), np.nan, dtype=object)
+        areas[found] = generation.areas[positions[found]]
+        continents[found] = generation.continents[positions[found]]
 
-        
         # Extract needed data
-        penetration_data = penetration_data[["Area", "Country code", "Year", "Continent", "Penetration_" + year_str,"Penetration_" + year_str + "_YoY_Change"]]
-        capacity_data  = capacity_data[["Country code", "Capacity_" + year_str, "Capacity_" + year_str + "_YoY_Change"]]
-        data_for_output = pd.merge(penetration_data, capacity_data, on="Country code", how="outer")
-
-        # Extract only data that is present in the CRP dataset
-        data_for_output = pd.merge(self.crp_data['Country code'], data_for_output, how="left", on="Country code")
+        data_for_output = pd.DataFrame({"Country code": country_codes,
+                                        "Area": np.where(has_penetration, areas, np.nan),
+                                        "Year": np.where(has_penetration, int(year_str), np.nan),
+                                        "Continent": np.where(has_penetration, continents, np.nan),
+                                        "Penetration_" + year_str: extract("Penetration"),
+                                        "Penetration_" + year_str + "_YoY_Change": extract("Penetration_YoY_Change"),
+                                        "Capacity_" + year_str: extract("Capacity"),
+                                        "Capacity_" + year_str + "_YoY_Change": extract("Capacity_YoY_Change")})
         
         return data_for_output
 
 
     def year_range_wacc(self, start_year, end_year, technology, country):
 
-        # Specify range
-        year_range = np.arange(start_year, end_year+1, 1)
+        # Calculate the yearly WACCs for the country in a single call
+        return self.calculate_country_waccs(country, technology, start_year=start_year, end_year=end_year)
 
-        # Loop across year_range
-        for year in year_range:
+    def calculate_country_waccs(self, country_code, technology, start_year=2015, end_year=None):
 
-            # Calculate yearly WACC
-            yearly_wacc = self.calculate_yearly_wacc(year, technology, country)
-            yearly_wacc["Year"] = int(year)
+        # Specify range, taking generation and tax data for the projection year from 2024
+        if end_year is None:
+            end_year = self.recent_year
+        years = np.arange(start_year, end_year+1, 1)
+        data_years = np.where(years == self.recent_year, 2024, years)
 
-            # Concat
-            if year == start_year:
-                storage_df = yearly_wacc
-            else:
-                storage_df = pd.concat([storage_df, yearly_wacc])
+        # Locate the country, returning no rows if it is not present
+        positions = self.inputs.locate(country_code)
+        if len(positions) == 0:
+            return pd.DataFrame(columns=["Country code"] + self.calculator.RESULT_COLUMNS + ["Year"])
+        position = positions[0]
 
+        # Extract the country's slice of each input
+        rf_rate = self.inputs.year_values("rf_rate", years)
+        erp = self.inputs.year_values("erp", years)
+        crp_data = self.inputs.country_values("crp", years, position)
+        cds_data = self.inputs.country_values("cds", years, position)
+        tax_data = self.inputs.country_values("tax_rate", data_years, position)
 
-        return storage_df
+        # Extract Generation Data
+        ember_name = self.ember_name(technology)
+        penetration = self.generation.country_penetration(position, data_years, ember_name)
+        if technology == "Other":
+            penetration = penetration * 0
+
+        # Calculate WACC and contributions
+        technology_premium = self.calculator.technology_premium_grid([technology], penetration[:, None])[:, 0]
+        debt_share = self.calculator.calculate_debt_share_individual(crp_data)
+        results = self.calculator.calculate_wacc_components(rf_rate=rf_rate, crp=crp_data, cds=cds_data, tax_rate=tax_data, erp=erp,
+                                                            technology_premium=technology_premium, debt_share=debt_share)
+        results = pd.DataFrame(data={"Country code": country_code, **results, "Year": years})
+
+        return results
     
 
     def projections_wacc(self, end_year, technology, country, interest_rates=None, GDP_change=None, renewable_targets=None):
 
+        # Calculate the projected WACCs for the country in a single call
+        return self.calculate_country_projections(country, technology, end_year, interest_rates=interest_rates, GDP_change=GDP_change, renewable_targets=renewable_targets)
+
+    def calculate_country_projections(self, country_code, technology, end_year, interest_rates=None, GDP_change=None, renewable_targets=None):
+
         # Specify range
-        year_range = np.arange(self.recent_year+1, end_year+1, 1)
+        years = np.arange(self.recent_year+1, end_year+1, 1)
+        year_old = self.recent_year
 
-        # Loop across year_range
-        for year in year_range:
+        # Locate the country, returning no rows if it is not present
+        positions = self.inputs.locate(country_code)
+        if len(positions) == 0:
+            return pd.DataFrame(columns=["Country code"] + self.calculator.RESULT_COLUMNS + ["Year"])
+        position = positions[0]
 
-            # Calculate yearly WACC
-            yearly_wacc = self.calculate_future_wacc(year, technology, country, interest_rates=interest_rates, GDP_change=GDP_change, renewable_targets=renewable_targets)
-            yearly_wacc["Year"] = int(year)
+        # Extract long term U.S. interest rates (proxy for risk free rate), held at the projection year unless changing
+        if interest_rates is not None:
+            rf_rate = self.inputs.year_values("rf_rate", years)
+        else:
+            rf_rate = np.full(len(years), self.inputs.year_value("rf_rate", year_old))
 
-            # Concat
-            if year == self.recent_year+1:
-                storage_df = yearly_wacc
-            else:
-                storage_df = pd.concat([storage_df, yearly_wacc])
+        # Extract CRPs and CDSs, scaled by the change in GDP per capita if selected
+        crp_data = np.full(len(years), self.inputs.get("crp", year_old, [position])[0])
+        cds_data = np.full(len(years), self.inputs.get("cds", year_old, [position])[0])
+        if GDP_change is not None:
+            gdp_scaling = self.gdp_ratios.multiplier(years, self.gdp_elasticity, [position])[0]
+            crp_data = crp_data * gdp_scaling
+            cds_data = cds_data * gdp_scaling
 
+        # Get ERP and tax data
+        erp = self.inputs.year_value("erp", year_old)
+        tax_data = self.inputs.get("tax_rate", year_old, [position])[0]
 
-        return storage_df
+        # Extract Generation Data
+        ember_name = self.ember_name(technology)
+        penetration = self.generation.country_penetration(position, years, ember_name)
+        if technology == "Other":
+            penetration = penetration * 0
 
-    def calculate_future_wacc(self, year, technology, country_code,  interest_rates=None, GDP_change=None, renewable_targets=None):
-        
-        def fill_missing_RE_values(data, previous_year, year):
+        # Interpolate towards renewable targets, if selected
+        if renewable_targets is not None:
+            penetration = self.country_target_penetration(country_code, position, technology, years, penetration)
+
+        # Calculate WACC and contributions
+        technology_premium = self.calculator.technology_premium_grid([technology], penetration[:, None])[:, 0]
+        debt_share = self.calculator.calculate_debt_share_individual(crp_data)
+        results = self.calculator.calculate_wacc_components(rf_rate=rf_rate, crp=crp_data, cds=cds_data, tax_rate=tax_data, erp=erp,
+                                                            technology_premium=technology_premium, debt_share=debt_share)
+        results = pd.DataFrame(data={"Country code": country_code, **results, "Year": years}, index=np.repeat(self.inputs.row_labels[position], len(years)))
 
-            # Set Country Code as index
-            data.set_index('Country code', inplace=True)
-            previous_year.set_index('Country code', inplace=True)
+        return results
 
-            # Fill missing values for 2023 with 2022 data
-            data = pd.merge(data, previous_year, on="Country code", how="left")
-            data['Penetration_' + str(year)] = data['Penetration_' + str(year)].fillna(data['Penetration_'+str(year-1)])
+    def ember_name(self, technology):
 
-            # Reset index if needed
-            data.reset_index(inplace=True)
+        # Map a technology onto the Ember variable used for its penetration
+        variable = str(self.tech_mappings.get(technology))
+        if variable == "Other":
+            ember_name = "Solar"
+        else:
+            ember_name = variable
+
+        return ember_name
+
+    def country_target_penetration(self, country_code, position, technology, years, penetration):
 
-            return data
+        # Interpolate the country's penetration linearly towards its target
+        return self.targets.trajectory(technology, penetration[None, :], years, self.recent_year, [position])[0]
 
+    def calculate_future_wacc(self, year, technology, country_code,  interest_rates=None, GDP_change=None, renewable_targets=None):
+        
         # Convert year into a string
         year_str = str(year)
         year_int = int(year)
         year_old = str(self.recent_year)
 
+        # Locate the country, returning no rows if it is not present
+        positions = self.inputs.locate(country_code)
+        if len(positions) == 0:
+            return pd.DataFrame(columns=["Country code"] + self.calculator.RESULT_COLUMNS + ["Year"])
+
         # Extract long term U.S. interest rates (proxy for risk free rate)
         if interest_rates is not None:
-            rf_rate = self.ir_data[self.ir_data['Country code'] == "USA"][year_str].values[0].astype(float)
+            rf_rate = self.inputs.year_value("rf_rate", year_str)
         else:
-            rf_rate = self.ir_data[self.ir_data['Country code'] == "USA"][year_old].values[0].astype(float)
+            rf_rate = self.inputs.year_value("rf_rate", year_old)
 
         # Extract CRPs
+        crp_data = self.inputs.get("crp", year_old, positions)[0]
+        cds_data = self.inputs.get("cds", year_old, positions)[0]
         if GDP_change is not None:
-            old_crp = self.pull_CRP_data(year_old)
-            old_cds = self.pull_CDS_data(year_old)
-            crps = self.calculate_future_crp(year_str=year_str, year_old=year_old, crp=old_crp, country_code=country_code)
-            cds = self.calculate_future_cds(year_str=year_str, year_old=year_old, cds=old_cds, country_code=country_code)
-        else:
-            crps = self.pull_CRP_data(year_old)
-            cds = self.pull_CDS_data(year_old)
-            crps = crps.rename(columns={"CRP_" + year_old: "CRP_"+year_str})
-            cds = cds.rename(columns={"CDS_" + year_old: "CDS_"+year_str})
-        
-        crp_data = crps.loc[crps["Country code"] == country_code, "CRP_"+year_str].values[0]
-        cds_data = cds.loc[cds["Country code"] == country_code, "CDS_"+year_str].values[0]
+            gdp_scaling = self.gdp_ratios.multiplier([year_int], self.gdp_elasticity, positions)[0, 0]
+            crp_data = crp_data * gdp_scaling
+            cds_data = cds_data * gdp_scaling
         
         
 
         # Get ERP data
-        erps = self.pull_CRP_data(year_old)
-        erp = erps.loc[erps['Country code']=="ERP"]["CRP_"+year_old][0].astype(float)
+        erp = self.inputs.year_value("erp", year_old)
         
 
         # Extract Generation Data 
-        if any(technology in s for s in ["Wave", "Tidal", "Geothermal", "Gas CCUS"]):
-            ember_name = "Other Renewables"
-        elif technology == "Wind Offshore":
-            ember_name = "Wind" 
-            ## PLACEHOLDER TO ADD IN DATA ON OFFSHORE WIND IN EUROPE FROM EMBERS DATA
-        else:
-            ember_name = technology
-        generation_data = self.pull_generation_data_v2(year_str, ember_name)
-        previous_year = self.pull_generation_data_v2(str(year_int-1), ember_name)
-        generation_data = fill_missing_RE_values(generation_data, previous_year, year_int)
-        generation_data = generation_data[['Country code', 'Penetration_'+year_str]]
-        generation_data.fillna(0, inplace=True)
-        generation_data.rename(columns={"Penetration_"+year_str:"Penetration"}, inplace=True)
-        if technology == "Gas CCUS":
+        ember_name = self.ember_name(technology)
+        generation_data = self.penetration_frame(year_int, ember_name)
+        if technology == "Other":
             generation_data["Penetration"] = generation_data["Penetration"] * 0
 
         # Select generation data for a given country
@@ -372,10 +889,7 @@ class WaccPredictor:
 
 
         # Extract Tax Rates
-        tax_rate = pd.merge(self.crp_data['Country code'], self.tax_data[['Country code', year_old]], on="Country code", how="left")
-        tax_rate["Tax Rate"] = tax_rate[year_old]
-        tax_rate['Tax Rate'] = tax_rate['Tax Rate'].fillna(value=0)
-        tax_data = tax_rate.loc[tax_rate["Country code"] == country_code, "Tax Rate"]
+        tax_data = self.input_series("tax_rate", year_old, positions)
         
                            
                            
@@ -389,152 +903,67 @@ class WaccPredictor:
 
     def evaluate_future_penetration(self, generation_data, technology, country_code, year_str, year_old):
 
-        # Extract renewable targets
-        renewable_targets = self.ember_targets.loc[(self.ember_targets["Country code"] == country_code) & (self.ember_targets["fuel_category"] == technology) 
-                                                   & (self.ember_targets["metric"] == "share_of_generation_pct")]
+        # Interpolate the penetration linearly towards the country's target
+        positions = self.inputs.locate(country_code)
+        penetration = generation_data["Penetration"].values[:, None]
+        generation_data["Penetration"] = self.targets.trajectory(technology, penetration, [int(year_str)], int(year_old), positions[:1])[:, 0]
 
-        # Check if renewable targets are present
-        if renewable_targets.empty:
-            return generation_data
-        else:
-            generation_data["Penetration"] = generation_data["Penetration"] + (int(year_str) - int(year_old)) * (renewable_targets["value"] - generation_data["Penetration"]) / (renewable_targets["target_year"].values[0] - int(year_old) )
         return generation_data
     
-    def calculate_future_crp(self, year_str, year_old, crp, country_code):
-
-        # Pull the GDP per capita data for the new and old year
-        year_orig = year_str
-        if year_str == "2030":
-            year_str = "2029"
-        try:
-            new_GDP = self.imf_data.loc[self.imf_data["Country code"] == country_code, year_str].values[0]
-            old_GDP = self.imf_data.loc[self.imf_data["Country code"] == country_code, year_old].values[0]
-        except:
-            new_GDP = 1
-            old_GDP = 1
-    
-
-        # Calculate the new CRP
-        crp["CRP_"+year_orig] = crp["CRP_"+year_old] * (float(new_GDP) / float(old_GDP)) ** (-0.15)
-        crp.drop(columns=["CRP_"+year_old], inplace=True)
-
-        return crp
-
-    def calculate_future_cds(self, year_str, year_old, cds, country_code):
-
-        # Pull the GDP per capita data for the new and old year
-        year_orig = year_str
-        if year_str == "2030":
-            year_str = "2029"
-        try:
-            new_GDP = self.imf_data.loc[self.imf_data["Country code"] == country_code, year_str].values[0]
-            old_GDP = self.imf_data.loc[self.imf_data["Country code"] == country_code, year_old].values[0]
-        except:
-            new_GDP = 1
-            old_GDP = 1
-
-        # Calculate the new CDS
-        cds["CDS_"+year_orig] = cds["CDS_"+year_old] * (float(new_GDP) / float(old_GDP)) ** (-0.15)
-        cds.drop(columns=["CDS_"+year_old], inplace=True)
-
-        return cds
-
-
     def calculate_future_crp_all(self, year_str, year_old, crp):
 
-        # Pull the GDP per capita data for the new and old year
-        year_orig = year_str
-        if year_str > "2029":
-            year_str = "2029"
-        new_GDP = self.imf_data.copy().rename(columns={year_str:"GDP_"+year_str})[["Country code", "GDP_"+year_str]]
-        old_GDP = self.imf_data.copy().rename(columns={"2024":"GDP_2024"})[["Country code", "GDP_2024"]]
-
-        # Merge onto the CRP
-        crp_merged = crp.merge(new_GDP, how="left", on="Country code").merge(old_GDP, how="left", on="Country code")
-
-        # Calculate the new CRP
-        crp_merged["GDP_Change"] = (crp_merged["GDP_"+year_str] / crp_merged["GDP_2024"])
-        crp_merged["GDP_Change"].clip(upper=1.25, lower=0.75, inplace=True)
-        crp_merged["GDP_Change"].fillna(1, inplace=True)
-        crp_merged["CRP_"+year_orig] = crp_merged["CRP_"+year_old] * (crp_merged["GDP_Change"]) ** (-0.15)
-        crp = crp_merged.drop(columns=["CRP_"+year_old, "GDP_"+year_str, "GDP_2024", "GDP_Change"])
+        # Scale the CRPs by the change in GDP per capita
+        crp = crp.copy()
+        crp["CRP_"+year_str] = crp["CRP_"+year_old] * self.future_multiplier(year_str, crp["Country code"])
+        crp = crp.drop(columns=["CRP_"+year_old])
 
         return crp
 
     def calculate_future_cds_all(self, year_str, year_old, cds):
 
-        # Pull the GDP per capita data for the new and old year
-        year_orig = year_str
-        if year_str > "2029":
-            year_str = "2029"
-        new_GDP = self.imf_data.copy().rename(columns={year_str:"GDP_"+year_str})[["Country code", "GDP_"+year_str]]
-        old_GDP = self.imf_data.copy().rename(columns={"2024":"GDP_2024"})[["Country code", "GDP_2024"]]
-
-        # Merge onto the CRP
-        cds_merged = cds.merge(new_GDP, how="left", on="Country code").merge(old_GDP, how="left", on="Country code")
-        
-        
-        # Calculate the new CDS
-        cds_merged["GDP_Change"] = (cds_merged["GDP_"+year_str] / cds_merged["GDP_2024"])
-        cds_merged["GDP_Change"].clip(upper=1.25, lower=0.75, inplace=True)
-        cds_merged["GDP_Change"].fillna(1, inplace=True)
-        cds_merged["CDS_"+year_orig] = cds_merged["CDS_"+year_old] * (cds_merged["GDP_Change"]) ** (-0.15)
-        cds = cds_merged.drop(columns=["CDS_"+year_old, "GDP_"+year_str, "GDP_2024", "GDP_Change"])
+        # Scale the CDSs by the change in GDP per capita
+        cds = cds.copy()
+        cds["CDS_"+year_str] = cds["CDS_"+year_old] * self.future_multiplier(year_str, cds["Country code"])
+        cds = cds.drop(columns=["CDS_"+year_old])
 
         return cds
 
+    def future_multiplier(self, year, country_codes):
 
-    def calculate_yearly_wacc(self, year, technology, country_code):
-
-        def fill_missing_RE_values(data, previous_year, year):
+        # Multiplier from the GDP ratio matrix for the given countries, with 1 for countries outside the matrix
+        positions = self.inputs.country_positions(country_codes.values)
+        multiplier = np.ones(len(positions))
+        multiplier[positions >= 0] = self.gdp_ratios.multiplier([int(year)], self.gdp_elasticity, positions[positions >= 0])[:, 0]
 
-            # Set Country Code as index
-            data.set_index('Country code', inplace=True)
-            previous_year.set_index('Country code', inplace=True)
+        return multiplier
 
-            # Fill missing values for 2023 with 2022 data
-            data = pd.merge(data, previous_year, on="Country code", how="left")
-            data['Penetration_' + str(year)] = data['Penetration_' + str(year)].fillna(data['Penetration_'+str(year-1)])
 
-            # Reset index if needed
-            data.reset_index(inplace=True)
+    def calculate_yearly_wacc(self, year, technology, country_code):
 
-            return data
-        
         # Convert year into a string
         year_str = str(year)
         year_int = int(year)
 
 
+        positions = self.inputs.locate(country_code)
+
         # Extract long term U.S. interest rates (proxy for risk free rate)
-        rf_rate = self.ir_data[self.ir_data['Country code'] == "USA"][year_str].values[0].astype(float)
+        rf_rate = self.inputs.year_value("rf_rate", year_str)
 
         # Extract CRPs
-        crps = self.pull_CRP_data(year_str)
-        erps = crps.copy()
-        erp = erps.loc[erps['Country code']=="ERP"]["CRP_"+year_str][0].astype(float)
-        crp_data = crps.loc[crps["Country code"] == country_code, "CRP_"+str(year)]
+        erp = self.inputs.year_value("erp", year_str)
+        crp_data = self.input_series("crp", year_str, positions)
 
         # Extract Cds
-        cds = self.pull_CDS_data(year_str)
-        cds_data = cds.loc[cds["Country code"] == country_code, "CDS_"+str(year)]
+        cds_data = self.input_series("cds", year_str, positions)
 
 
         # Extract Generation Data
-        if year == self.recent_year:
+        if int(year) == self.recent_year:
             year_str = "2024"
             year_int = 2024
-        variable = str(self.tech_mappings.get(technology))
-        if variable == "Other":
-            ember_name = "Solar"
-        else:
-            ember_name = variable
-        generation_data = self.pull_generation_data_v2(year_str, ember_name)
-        previous_year = self.pull_generation_data_v2(str(year_int-1), ember_name)
-        generation_data = fill_missing_RE_values(generation_data, previous_year, year_int)
-        generation_data = pd.merge(self.crp_data['Country code'],generation_data[['Country code', 'Penetration_'+year_str]], on="Country code", how="left")
-        generation_data.fillna(0, inplace=True)
-        generation_data.rename(columns={"Penetration_"+year_str:"Penetration"}, inplace=True)
+        ember_name = self.ember_name(technology)
+        generation_data = self.penetration_frame(year_int, ember_name)
         if technology == "Other":
             generation_data["Penetration"] = generation_data["Penetration"] * 0
 
@@ -547,11 +976,8 @@ class WaccPredictor:
 
 
         # Extract Tax Rates
-        tax_rate = pd.merge(self.crp_data['Country code'], self.tax_data[['Country code', year_str]], on="Country code", how="left")
-        tax_rate["Tax Rate"] = tax_rate[year_str]
-        tax_rate['Tax Rate'] = tax_rate['Tax Rate'].fillna(value=0)
-        tax_data = tax_rate.loc[tax_rate["Country code"] == country_code, "Tax Rate"]
-        if year == str(self.recent_year):
+        tax_data = self.input_series("tax_rate", year_str, positions)
+        if int(year) == self.recent_year:
             year_str = str(year)
                            
                            
@@ -565,26 +991,53 @@ class WaccPredictor:
 
     def calculate_technology_wacc(self, year, country, technologies):
 
+        # Set up the technologies, resolving each technology's Ember variable
+        technologies = list(technologies)
+        year_int = int(year)
+        year_old = self.recent_year
+        future = year_int > self.recent_year
+        ember_names = [self.ember_name(technology) for technology in technologies]
+        zero_penetration = np.isin(technologies, ["Other"])
+
+        # Locate the country, returning no rows if it is not present
+        positions = self.inputs.locate(country)
+        if len(positions) == 0:
+            return pd.DataFrame(columns=["Country code"] + self.calculator.RESULT_COLUMNS + ["Year", "Technology"])
+        position = positions[0]
+
+        # Extract the country's inputs, with projections scaled by the change in GDP per capita from the projection year
+        if future:
+            data_year = year_int
+            rf_rate = self.inputs.year_value("rf_rate", year_int)
+            erp = self.inputs.year_value("erp", year_old)
+            gdp_scaling = self.gdp_ratios.multiplier([year_int], self.gdp_elasticity, [position])[0, 0]
+            crp_data = self.inputs.get("crp", year_old, [position])[0] * gdp_scaling
+            cds_data = self.inputs.get("cds", year_old, [position])[0] * gdp_scaling
+            tax_data = self.inputs.get("tax_rate", year_old, [position])[0]
+        else:
+            data_year = 2024 if year_int == self.recent_year else year_int
+            rf_rate = self.inputs.year_value("rf_rate", year_int)
+            erp = self.inputs.year_value("erp", year_int)
+            crp_data = self.inputs.get("crp", year_int, [position])[0]
+            cds_data = self.inputs.get("cds", year_int, [position])[0]
+            tax_data = self.inputs.get("tax_rate", data_year, [position])[0]
+
+        # Extract penetration once for each distinct Ember variable
+        ember_penetration = {ember_name: self.generation.country_penetration(position, [data_year], ember_name)[0] for ember_name in set(ember_names)}
+        penetration = np.array([ember_penetration[ember_name] for ember_name in ember_names], dtype=float)
+        penetration[zero_penetration] = 0
+
+        # Interpolate projections towards renewable targets
+        if future:
+            for i, technology in enumerate(technologies):
+                penetration[i:i+1] = self.country_target_penetration(country, position, technology, np.array([year_int]), penetration[i:i+1])
+
+        # Calculate WACC and contributions for all technologies
+        technology_premium = self.calculator.technology_premium_grid(technologies, penetration)
+        debt_share = self.calculator.calculate_debt_share_individual(crp_data)
+        results = self.calculator.calculate_wacc_components(rf_rate=rf_rate, crp=crp_data, cds=cds_data, tax_rate=tax_data, erp=erp,
+                                                            technology_premium=technology_premium, debt_share=debt_share)
+        results = pd.DataFrame(data={"Country code": country, **results, "Year": year_int, "Technology": technologies},
+                               index=np.repeat(self.inputs.row_labels[position], len(technologies)))
 
-        # Loop across year_range
-        for i, tech in enumerate(technologies):
-
-            # Calculate yearly WACC
-            if int(year) > self.recent_year:
-                tech_wacc = self.calculate_future_wacc(year, tech, country, GDP_change="Yes", renewable_targets="Yes", interest_rates="Yes")
-            else:
-                tech_wacc = self.calculate_yearly_wacc(year, tech, country)
-            tech_wacc["Year"] = int(year)
-            tech_wacc["Technology"] = tech
-
-            # Concat
-            if i == 0:
-                storage_df = tech_wacc
-            else:
-                storage_df = pd.concat([storage_df, tech_wacc])
-
-        return storage_df
-
-        
-
-        
+        return results
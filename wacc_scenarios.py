@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+
+class ScenarioSet:
+
+    # Settings of a scenario, with defaults matching WaccPredictor.calculate_wacc_grid
+    DEFAULTS = {"interest_rates": True, "rf_rate": None, "rf_shift": 0, "GDP_change": True, "gdp_shock": 0,
+                "erp": None, "lenders_margin": None, "renewable_targets": False, "target_scale": 1}
+
+    def __init__(self, scenarios):
+        """ Initialises the ScenarioSet Class, which holds named what-if scenarios and expands their settings into arrays
+        with a leading scenario axis, so that all scenarios can be evaluated together on the country x year x technology grid
+
+        Inputs:
+        Scenarios - dictionary mapping scenario names to dictionaries of settings, or a dataframe with one row per scenario
+        indexed by name. Settings that are not given take their defaults:
+            Interest_rates - use the projected risk free rate in each year (True) or hold the rate of the most recent year (False)
+            Rf_rate - risk free rate path replacing the data, as a single value or a dictionary of {year: rate} interpolated between years
+            Rf_shift - change added to the risk free rate in every year
+            GDP_change - scale future CRPs and CDSs by the change in GDP per capita
+            Gdp_shock - change to annual growth in GDP per capita (percentage points) over the GDP projections
+            Erp - equity risk premium replacing the data
+            Lenders_margin - lenders margin replacing WaccCalculator.lenders_margin
+            Renewable_targets - interpolate projected penetration towards the Ember renewable targets
+            Target_scale - factor applied to the renewable targets
+        """
+
+        # Read the settings of each scenario
+        if isinstance(scenarios, pd.DataFrame):
+            scenarios = {name: row.dropna().to_dict() for name, row in scenarios.iterrows()}
+        self.names = [str(name) for name in scenarios]
+        self.settings = []
+        for name, settings in scenarios.items():
+            unknown = set(settings) - set(self.DEFAULTS)
+            if unknown:
+                raise ValueError("Unknown settings for scenario " + str(name) + ": " + ", ".join(sorted(unknown)))
+            self.settings.append({**self.DEFAULTS, **settings})
+
+    def __len__(self):
+
+        return len(self.names)
+
+    def values(self, setting, default=None):
+
+        # Value of a setting for each scenario, using the default where the setting is None
+        return [default if settings[setting] is None else settings[setting] for settings in self.settings]
+
+    def rf_rates(self, years, projected_rf, recent_rf):
+
+        # Risk free rate for each scenario and year, from the projections, the most recent year or the given path
+        years = np.asarray(years, dtype=int)
+        rf_rates = np.empty((len(self), len(years)))
+        for i, settings in enumerate(self.settings):
+            path = settings["rf_rate"]
+            if path is None:
+                rf_rates[i] = projected_rf if settings["interest_rates"] else recent_rf
+            elif isinstance(path, dict):
+                path_years = sorted(path)
+                rf_rates[i] = np.interp(years, path_years, [path[year] for year in path_years])
+            else:
+                rf_rates[i] = path
+            rf_rates[i] += settings["rf_shift"]
+
+        return rf_rates
+
+    def erps(self, erp):
+
+        # Equity risk premium for each scenario and year
+        return np.array([erp if value is None else np.full(len(erp), value) for value in self.values("erp")], dtype=float)
+
+    def lenders_margins(self, lenders_margin):
+
+        # Lenders margin for each scenario
+        return np.array(self.values("lenders_margin", lenders_margin), dtype=float)
+
+    def target_scales(self):
+
+        # Scale on the renewable targets for each scenario, with None where targets are not used
+        return [settings["target_scale"] if settings["renewable_targets"] else None for settings in self.settings]
+
+    def gdp_shocks(self):
+
+        # Shock to GDP growth for each scenario, with None where future CRPs and CDSs are not scaled by GDP
+        return [settings["gdp_shock"] if settings["GDP_change"] else None for settings in self.settings]
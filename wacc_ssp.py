@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+
+class SSPPathways:
+    def __init__(self, gdp_pathways, countries, years, penetration_pathways=None, rf_pathways=None):
+        """ Initialises the SSPPathways Class, which interpolates long-term pathways for the Shared Socioeconomic Pathways
+        (SSPs) onto annual scenario x country x year arrays, for the long-horizon projections
+
+        Inputs:
+        Gdp_pathways - GDP per capita pathways, in long format with columns SSP, Country code, Year and GDP per capita
+        Countries - country codes defining the country axis, normally those of the InputCube
+        Years - projection years, e.g. 2025 to 2100
+        Penetration_pathways - optional share of generation pathways (%), in long format with columns SSP, Country code, Year,
+        Variable (Ember variable, e.g. Solar or Wind) and Penetration
+        Rf_pathways - optional risk free rate pathways (%), in long format with columns SSP, Year and Risk free rate
+
+        Pathways given at coarser intervals (e.g. every five years) are interpolated linearly between the given years.
+        Values outside the years covered by a pathway are left missing.
+        """
+
+        # Set up the axes, with the SSPs in the order given
+        self.countries = np.asarray(countries)
+        self.country_index = pd.Index(self.countries)
+        self.years = np.asarray(years, dtype=int)
+        self.ssps = list(pd.unique(gdp_pathways["SSP"]))
+
+        # Interpolate GDP per capita as an SSP x country x year array
+        self.gdp_pathways = gdp_pathways
+        self.gdp = self.interpolate(gdp_pathways, ["SSP", "Country code"], "GDP per capita")
+
+        # Interpolate penetration for each Ember variable, if given
+        self.penetration = {}
+        if penetration_pathways is not None:
+            for variable, pathways in penetration_pathways.groupby("Variable", observed=True):
+                self.penetration[variable] = self.interpolate(pathways, ["SSP", "Country code"], "Penetration")
+
+        # Interpolate risk free rates as an SSP x year array, if given
+        self.rf_rate = None
+        if rf_pathways is not None:
+            self.rf_rate = self.interpolate(rf_pathways, ["SSP"], "Risk free rate")
+
+    def interpolate(self, pathways, keys, value, years=None):
+
+        # Pivot into rows of keys and columns of the given years, interpolating linearly onto every year
+        years = self.years if years is None else np.asarray(years, dtype=int)
+        wide = pathways.pivot_table(index=keys, columns="Year", values=value, aggfunc="last")
+        wide.columns = wide.columns.astype(int)
+        all_years = np.union1d(wide.columns, years)
+        wide = wide.reindex(columns=all_years).interpolate(axis=1, limit_area="inside")[years]
+
+        # Place the rows on the SSP (and country) axes
+        ssp_positions = pd.Index(self.ssps).get_indexer(wide.index.get_level_values("SSP"))
+        if "Country code" not in keys:
+            values = np.full((len(self.ssps), len(years)), np.nan)
+            values[ssp_positions[ssp_positions >= 0]] = wide.values[ssp_positions >= 0]
+            return values
+        country_positions = self.country_index.get_indexer(wide.index.get_level_values("Country code"))
+        keep = (ssp_positions >= 0) & (country_positions >= 0)
+        values = np.full((len(self.ssps), len(self.countries), len(years)), np.nan)
+        values[ssp_positions[keep], country_positions[keep]] = wide.values[keep]
+
+        return values
+
+    def gdp_ratio(self, base_year, lower=0.75, upper=1.25):
+
+        # Clipped change in GDP per capita since the base year along each pathway, set to 1 where it cannot be calculated
+        base_GDP = self.interpolate(self.gdp_pathways, ["SSP", "Country code"], "GDP per capita", years=[base_year])
+        ratios = np.clip(self.gdp / base_GDP, lower, upper)
+
+        return np.where(np.isnan(ratios), 1, ratios)
+
+    def memory_usage(self):
+
+        return self.gdp.nbytes + sum(values.nbytes for values in self.penetration.values()) + (0 if self.rf_rate is None else self.rf_rate.nbytes)
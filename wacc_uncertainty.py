@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class ParameterSampler:
+
+    # Uncertain parameters, in the order their random streams are spawned
+    PARAMETERS = ["erp_shift", "gdp_elasticity", "lenders_margin", "boundary_scale", "mature_premium_scale", "immature_premium_scale"]
+
+    # Distributions that can be sampled, with the parameters they take
+    DISTRIBUTIONS = {"normal": ["loc", "scale"], "uniform": ["low", "high"], "triangular": ["left", "mode", "right"],
+                     "lognormal": ["mean", "sigma"], "beta": ["a", "b"]}
+
+    def __init__(self, distributions, defaults, seed=None):
+        """ Initialises the ParameterSampler Class, which draws reproducible samples of the uncertain model parameters
+        from user-specified distributions
+
+        Inputs:
+        Distributions - dictionary mapping parameters to a distribution, given as a tuple of its name and parameters
+        (e.g. ("normal", -0.15, 0.05) or ("triangular", 1, 2, 3)), or to a single value to hold the parameter fixed:
+            Erp_shift - change added to the equity risk premium
+            Gdp_elasticity - elasticity of future CRPs and CDSs to the change in GDP per capita
+            Lenders_margin - lenders margin
+            Boundary_scale - factor on the penetration boundaries (TechBoundaries.csv)
+            Mature_premium_scale - factor on the mature technology premiums (MaturityPremiums.csv)
+            Immature_premium_scale - factor on the immature technology premiums (MaturityPremiums.csv)
+        Defaults - values of the parameters that are not given
+        Seed - seed of the random streams. Each parameter has its own stream, so the draws of one parameter do not
+        depend on which other parameters are uncertain
+        """
+
+        # Check the distributions
+        unknown = set(distributions) - set(self.PARAMETERS)
+        if unknown:
+            raise ValueError("Unknown uncertain parameters: " + ", ".join(sorted(unknown)))
+        for parameter, distribution in distributions.items():
+            if isinstance(distribution, tuple):
+                if distribution[0] not in self.DISTRIBUTIONS:
+                    raise ValueError("Unknown distribution for " + parameter + ": " + str(distribution[0]))
+                if len(distribution) - 1 != len(self.DISTRIBUTIONS[distribution[0]]):
+                    raise ValueError("Distribution " + distribution[0] + " for " + parameter + " takes parameters " + ", ".join(self.DISTRIBUTIONS[distribution[0]]))
+        self.distributions = {**defaults, **distributions}
+        self.seed = seed
+
+    def sample(self, draws):
+
+        # Spawn one random stream per parameter from the seed
+        streams = np.random.SeedSequence(self.seed).spawn(len(self.PARAMETERS))
+
+        # Draw each parameter, repeating fixed values
+        samples = {}
+        for parameter, stream in zip(self.PARAMETERS, streams):
+            distribution = self.distributions[parameter]
+            if isinstance(distribution, tuple):
+                samples[parameter] = getattr(np.random.default_rng(stream), distribution[0])(*distribution[1:], size=draws)
+            else:
+                samples[parameter] = np.full(draws, float(distribution))
+
+        return samples